@@ -6,7 +6,7 @@ import werkzeug
 from werkzeug.utils import secure_filename
 import uuid
 import datetime
-from services.db_service import get_db_connection
+from services.db_service import get_db_connection, encode_page_cursor, decode_page_cursor, PoolExhaustedError
 from services.pdf_service import PDFGenerator
 from services.analytics_service import AnalyticsService
 from services.fuzzy_duplicate_service import (
@@ -72,7 +72,7 @@ from services.cashflow_forecaster import (
 from rag_engine import RAGController
 from db_config import DB_CONFIG
 from services.invoice_db_service import invoice_db_service
-from services.payment_service import payment_service
+from services.payment_service import payment_service, BULK_INSERT_CHUNK
 from services.atlas_master_service import get_master_service
 from services.atlas_bulk_service import get_bulk_service
 
@@ -196,6 +196,13 @@ try:
 except ImportError as e:
     print(f"⚠️  R Analytics routes not available: {e}")
 
+@app.errorhandler(PoolExhaustedError)
+def handle_pool_exhausted(e):
+    """Every pooled connection stayed busy past the acquire timeout: ask the client to retry"""
+    response = jsonify({"success": False, "error": "Database is busy, please retry"})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
 UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
@@ -204,6 +211,7 @@ print("Initializing Services...")
 rag_engine = RAGController()
 analytics_service = AnalyticsService(DB_CONFIG)
 pdf_generator = PDFGenerator()
+invoice_db_service.ensure_schema()
 
 # Initialize Atlas Services
 print("[Atlas] Initializing Atlas Master Data & Bulk Services...")
@@ -536,10 +544,14 @@ def get_vendors_stats():
 
 @app.route('/api/locations', methods=['GET'])
 def get_locations():
-    """Get all locations from MySQL"""
+    """Get all locations from MySQL; ?city= matches word prefixes of the city name, not substrings"""
     location_type = request.args.get('type')
     city = request.args.get('city')
-    result = api_get_locations(location_type, city)
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor')
+    result = api_get_locations(location_type, city, limit, cursor)
+    if not result.get('success'):
+        return jsonify(result), 400
     return jsonify(result)
 
 @app.route('/api/locations/<location_id>', methods=['GET'])
@@ -591,7 +603,10 @@ def get_invoices_list():
     vendor_id = request.args.get('vendor_id')
     limit = int(request.args.get('limit', 100))
     offset = int(request.args.get('offset', 0))
-    result = api_get_invoices(status, vendor_id, limit, offset)
+    cursor = request.args.get('cursor')
+    result = api_get_invoices(status, vendor_id, limit, offset, cursor)
+    if not result.get('success'):
+        return jsonify(result), 400
     return jsonify(result)
 
 @app.route('/api/invoices/<invoice_id>', methods=['GET'])
@@ -1761,6 +1776,15 @@ def create_user_notification():
 # PAYMENT SYSTEM ENDPOINTS (Full Integration)
 # ============================================================================
 
+def _payment_page_after(cursor):
+    """Decode a payments list next_cursor into its (sort value, id) keyset; None for the first page"""
+    if not cursor:
+        return None
+    after = decode_page_cursor(cursor)
+    if len(after) != 2:
+        raise ValueError('Invalid page cursor')
+    return tuple(after)
+
 # --- Payment Queue ---
 @app.route('/api/payments/queue', methods=['GET'])
 def get_payment_queue():
@@ -1840,8 +1864,18 @@ def import_bank_statement():
 @app.route('/api/payments/reconciliation', methods=['GET'])
 def get_unmatched_transactions():
     """Get unmatched bank transactions."""
-    transactions = payment_service.get_unmatched_transactions()
-    return jsonify({"transactions": transactions, "count": len(transactions)})
+    limit = request.args.get('limit', type=int)
+    try:
+        after = _payment_page_after(request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({"error": str(e), "success": False}), 400
+    transactions = payment_service.get_unmatched_transactions(limit, after)
+    last = transactions[-1] if limit and len(transactions) == limit else None
+    return jsonify({
+        "transactions": transactions,
+        "count": len(transactions),
+        "next_cursor": encode_page_cursor((last['transaction_date'], last['id'])) if last else None
+    })
 
 @app.route('/api/payments/reconciliation/<recon_id>/match', methods=['POST'])
 def match_bank_transaction(recon_id):
@@ -1869,6 +1903,20 @@ def calculate_early_discount(invoice_id):
         return jsonify(discount)
     return jsonify({"eligible": False, "reason": "Unable to calculate discount"}), 404
 
+@app.route('/api/payments/discount/bulk', methods=['POST'])
+def calculate_early_discounts():
+    """Calculate early payment discounts for several invoices at once."""
+    data = request.json or {}
+    invoice_ids = data.get('invoiceIds', []) if isinstance(data, dict) else None
+    if not isinstance(invoice_ids, list) or not all(isinstance(i, str) for i in invoice_ids):
+        return jsonify({"error": "invoiceIds must be a list of strings", "success": False}), 400
+    invoice_ids = list(dict.fromkeys(invoice_ids))
+    # One IN (...) list per request; bigger sets go in several calls
+    if len(invoice_ids) > BULK_INSERT_CHUNK:
+        return jsonify({"error": f"At most {BULK_INSERT_CHUNK} invoiceIds per request", "success": False}), 400
+    discounts = payment_service.calculate_early_discount_bulk(invoice_ids)
+    return jsonify({"discounts": discounts, "count": len(discounts)})
+
 @app.route('/api/payments/discount/terms', methods=['POST'])
 def set_vendor_discount_terms():
     """Set early payment terms for a vendor."""
@@ -1888,8 +1936,18 @@ def set_vendor_discount_terms():
 @app.route('/api/vendor/payments/<vendor_id>', methods=['GET'])
 def get_vendor_payments(vendor_id):
     """Get all payments for a specific vendor."""
-    payments = payment_service.get_vendor_payments(vendor_id)
-    return jsonify({"payments": payments, "count": len(payments)})
+    limit = request.args.get('limit', type=int)
+    try:
+        after = _payment_page_after(request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({"error": str(e), "success": False}), 400
+    payments = payment_service.get_vendor_payments(vendor_id, limit, after)
+    last = payments[-1] if limit and len(payments) == limit else None
+    return jsonify({
+        "payments": payments,
+        "count": len(payments),
+        "next_cursor": encode_page_cursor((last['created_at'], last['id'])) if last else None
+    })
 
 @app.route('/api/vendor/payments/<vendor_id>/summary', methods=['GET'])
 def get_vendor_payment_summary(vendor_id):
@@ -2702,6 +2760,13 @@ def get_all_invoices():
     """Get all invoices from MySQL for the main workbench."""
     try:
         invoices = invoice_db_service.get_all_invoices()
+
+        # Optionally attach linked documents in one batched query instead of one call per row
+        if request.args.get('include_documents', 'false').lower() == 'true':
+            documents = invoice_db_service.get_documents_for_invoices([inv['id'] for inv in invoices])
+            for inv in invoices:
+                inv['documents'] = documents.get(inv['id'], [])
+
         return jsonify({
             'success': True,
             'invoices': invoices,
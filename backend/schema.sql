@@ -181,9 +181,14 @@ CREATE TABLE IF NOT EXISTS currency_rates (
 -- ============================================================================
 CREATE INDEX idx_batches_status ON payment_batches(status);
 CREATE INDEX idx_batches_scheduled ON payment_batches(scheduled_date);
+CREATE INDEX idx_batches_bank_ref ON payment_batches(bank_reference, status); -- auto_reconcile reference match
 CREATE INDEX idx_transactions_batch ON payment_transactions(batch_id);
 CREATE INDEX idx_transactions_invoice ON payment_transactions(invoice_id);
-CREATE INDEX idx_transactions_vendor ON payment_transactions(vendor_id);
-CREATE INDEX idx_recon_status ON bank_reconciliations(status);
+-- Vendor portal list + summary; covers the summary's conditional aggregates
+CREATE INDEX idx_transactions_vendor ON payment_transactions(vendor_id, status, final_amount, discount_amount);
+CREATE INDEX idx_transactions_vendor_created ON payment_transactions(vendor_id, created_at, id); -- vendor payment list, keyset pages
+CREATE INDEX idx_recon_status ON bank_reconciliations(status, transaction_date); -- unmatched list, newest first
 CREATE INDEX idx_recon_date ON bank_reconciliations(transaction_date);
+CREATE INDEX idx_invoices_status_due ON supplier_invoices(status, due_date); -- payment queue
+CREATE INDEX idx_terms_vendor_active ON early_payment_terms(vendor_id, is_active);
 CREATE INDEX idx_notifications_recipient ON notifications(recipient_id, is_read);
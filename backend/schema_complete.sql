@@ -79,9 +79,10 @@ CREATE TABLE IF NOT EXISTS locations (
     is_active BOOLEAN DEFAULT TRUE,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-    INDEX idx_city (city),
+    INDEX idx_city_name (city, name),
     INDEX idx_type (type),
-    INDEX idx_code (code)
+    INDEX idx_code (code),
+    FULLTEXT INDEX ft_city (city)
 );
 
 -- ============================================================================
@@ -320,6 +320,17 @@ CREATE TABLE IF NOT EXISTS invoices (
 CREATE TRIGGER update_invoices_timestamp BEFORE UPDATE ON invoices
 FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+-- Keyset pagination for GET /api/invoices: WHERE (invoice_date, id) < (...) ORDER BY invoice_date DESC, id DESC
+CREATE INDEX IF NOT EXISTS idx_invoices_date_id ON invoices (invoice_date DESC, id DESC);
+
+-- Same page order under the status / vendor_id filters of GET /api/invoices
+CREATE INDEX IF NOT EXISTS idx_invoices_status_date_id ON invoices (status, invoice_date DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_invoices_vendor_date_id ON invoices (vendor_id, invoice_date DESC, id DESC);
+
+-- Invoice stats (GROUP BY status, optionally per vendor) as an index-only scan
+CREATE INDEX IF NOT EXISTS idx_invoices_vendor_status ON invoices (vendor_id, status) INCLUDE (total_amount);
+-- On a live table build these with CREATE INDEX CONCURRENTLY (outside a transaction)
+
 -- ============================================================================
 -- 9. NOTIFICATIONS & AUDIT
 -- ============================================================================
@@ -0,0 +1,14 @@
+-- Bring the locations indexes of an existing database up to date with schema_complete.sql
+-- Run this once on databases created before these indexes changed; fresh installs get
+-- them from schema_complete.sql directly
+
+USE ledgerone;
+
+-- Keyset pages ORDER BY city, name, id; idx_city (city) is a redundant prefix of the new index
+ALTER TABLE locations
+DROP INDEX idx_city,
+ADD INDEX idx_city_name (city, name);
+
+-- City filter: word-prefix MATCH ... AGAINST in BOOLEAN MODE needs this index, without it
+-- MySQL rejects the query (error 1191)
+ALTER TABLE locations ADD FULLTEXT INDEX ft_city (city);
@@ -0,0 +1,24 @@
+-- Bring the payment-system indexes of an existing database up to date with schema.sql
+-- Run this once on databases created before these indexes changed; fresh installs get
+-- them from schema.sql directly
+
+USE ledgerone;
+
+-- Widened indexes: drop and re-add in one ALTER so the table is never left without them
+-- Vendor portal list + summary; covers the summary's conditional aggregates
+ALTER TABLE payment_transactions
+DROP INDEX idx_transactions_vendor,
+ADD INDEX idx_transactions_vendor (vendor_id, status, final_amount, discount_amount);
+
+-- Unmatched list, newest first
+ALTER TABLE bank_reconciliations
+DROP INDEX idx_recon_status,
+ADD INDEX idx_recon_status (status, transaction_date);
+
+-- New indexes
+CREATE INDEX idx_batches_bank_ref ON payment_batches(bank_reference, status); -- auto_reconcile reference match
+CREATE INDEX idx_invoices_status_due ON supplier_invoices(status, due_date); -- payment queue
+CREATE INDEX idx_terms_vendor_active ON early_payment_terms(vendor_id, is_active);
+
+-- Vendor payment list: keyset pagination on (created_at, id) within one vendor
+CREATE INDEX idx_transactions_vendor_created ON payment_transactions(vendor_id, created_at, id);
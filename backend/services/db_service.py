@@ -1,3 +1,9 @@
+import base64
+import json
+import os
+import threading
+import time
+from functools import wraps
 import psycopg2
 from psycopg2.extras import RealDictCursor
 from db_config import DATABASE_URL
@@ -14,3 +20,119 @@ def get_cursor(conn):
     """Factory to get real dict cursor (compatible with previous dictionary=True behavior)"""
     return conn.cursor(cursor_factory=RealDictCursor)
 
+
+
+def encode_page_cursor(values) -> str:
+    """
+    Opaque keyset-pagination token for the last row's sort key (e.g. (invoice_date, id)).
+    A NULL sort value stays null in the token, so it decodes back to None, not 'None'.
+    """
+    return base64.urlsafe_b64encode(
+        json.dumps([None if v is None else str(v) for v in values]).encode()
+    ).decode()
+
+
+def decode_page_cursor(token: str) -> list:
+    """Inverse of encode_page_cursor; raises ValueError on a malformed token"""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid page cursor: {token!r}") from e
+    if not isinstance(values, list):
+        raise ValueError(f"Invalid page cursor: {token!r}")
+    return values
+
+
+# Crockford base32, the ULID alphabet (sorts the same as the underlying integer)
+_ULID_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_ulid_lock = threading.Lock()
+_ulid_last = (0, 0)  # (timestamp_ms, randomness) of the previous ULID
+
+
+def new_ulid() -> str:
+    """
+    26-char ULID: 48-bit millisecond timestamp + 80 random bits.
+    
+    Unique without a database round trip and lexicographically time-ordered; IDs made
+    in the same millisecond increment the random part, so they stay strictly increasing
+    within this process.
+    """
+    global _ulid_last
+    now_ms = time.time_ns() // 1_000_000
+    with _ulid_lock:
+        last_ms, last_rand = _ulid_last
+        if now_ms <= last_ms:
+            now_ms, rand = last_ms, last_rand + 1
+            if rand >> 80:  # 2**80 IDs in one millisecond: borrow the next one
+                now_ms, rand = last_ms + 1, int.from_bytes(os.urandom(10), 'big')
+        else:
+            rand = int.from_bytes(os.urandom(10), 'big')
+        _ulid_last = (now_ms, rand)
+    value = (now_ms << 80) | rand
+    return ''.join(_ULID_ALPHABET[(value >> shift) & 31] for shift in range(125, -1, -5))
+
+
+# Seconds a request waits for a free pooled connection before giving up with a 503
+POOL_ACQUIRE_TIMEOUT = float(os.getenv('DB_POOL_ACQUIRE_TIMEOUT', 5))
+
+
+class PoolExhaustedError(Exception):
+    """No pooled connection came free within POOL_ACQUIRE_TIMEOUT; app.py answers 503."""
+
+
+def acquire_pooled(get_connection, exhausted, timeout: float = POOL_ACQUIRE_TIMEOUT):
+    """
+    Borrow from a pool that raises `exhausted` instead of blocking when it is empty
+    (psycopg2 and mysql.connector pools both do): retry with backoff for up to `timeout`
+    seconds, then raise PoolExhaustedError.
+    
+    PoolExhaustedError is deliberately outside every driver's error hierarchy, so
+    db_op lets it through instead of turning a busy database into an empty result.
+    """
+    deadline = time.monotonic() + timeout
+    delay = 0.005
+    while True:
+        try:
+            return get_connection()
+        except exhausted as e:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise PoolExhaustedError(f"No database connection free after {timeout}s") from e
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, 0.1)
+
+
+def make_db_op(connection, errors, logger):
+    """
+    Build a `db_op` method decorator for one service's connection source.
+    
+    `connection` is a context manager yielding a connection that is rolled back on
+    error and always released. The decorated method receives an open cursor after
+    `self`; database `errors` are logged and turned into the method's default result.
+    
+        db_op = make_db_op(pg_conn, psycopg2.Error, logger)
+        
+        @db_op(default=list, cursor_factory=RealDictCursor)
+        def get_things(self, cursor, ...): ...
+    """
+    def db_op(default=None, commit=False, **cursor_kwargs):
+        def decorator(fn):
+            @wraps(fn)
+            def wrapper(self, *args, **kwargs):
+                try:
+                    with connection() as conn:
+                        cursor = conn.cursor(**cursor_kwargs)
+                        try:
+                            result = fn(self, cursor, *args, **kwargs)
+                        finally:
+                            cursor.close()
+                        if commit:
+                            conn.commit()
+                        return result
+                except errors:
+                    logger.exception("%s failed", fn.__qualname__)
+                    # Callable defaults (list, dict) give each failure a fresh container
+                    return default() if callable(default) else default
+            return wrapper
+        return decorator
+    return db_op
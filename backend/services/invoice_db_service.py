@@ -1,8 +1,88 @@
 from services.db_service import get_db_connection, get_cursor
+from psycopg2.extras import execute_values
+import json
+import logging
+import re
 import uuid
-from datetime import datetime
+from collections import defaultdict
+from contextlib import contextmanager
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# Max invoice ids bound into a single IN (...) list
+DOCUMENT_ID_CHUNK_SIZE = 1000
+
+# Rows folded into each multi-row INSERT ... VALUES statement by execute_values
+INSERT_BATCH_SIZE = 1000
+
+# Anything that isn't part of a number: thousands separators, ₹/$ glyphs, whitespace
+_AMOUNT_STRIP_RE = re.compile(r'[^\d.\-]')
+
+
+def parse_amount(amount):
+    """Parse an amount like '₹1,23,456.00' to float in a single scan; unparseable values give 0.0."""
+    if isinstance(amount, (int, float)):
+        return float(amount)
+    try:
+        return float(_AMOUNT_STRIP_RE.sub('', str(amount)) or 0)
+    except ValueError:
+        return 0.0
+
+
+def dumps_json(value):
+    """Serialize to a JSON string, using orjson's C encoder when installed."""
+    if ORJSON_AVAILABLE:
+        # Decode: psycopg2 would bind raw bytes as bytea, not json
+        return orjson.dumps(value).decode()
+    return json.dumps(value)
+
 
 class InvoiceDBService:
+    def __init__(self):
+        self._schema_ready = False
+
+    def ensure_schema(self):
+        """Run this service's DDL once per process; call from app startup, not on import."""
+        if self._schema_ready:
+            return
+        self._schema_ready = self.ensure_documents_table()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Yield a cursor bound to one connection; commit once on exit, roll back on error.
+
+        Pass the cursor as cursor= to update_status / create_notification* / save_document
+        to group a status change and its notifications into a single commit.
+        """
+        conn = get_db_connection()
+        conn.autocommit = False
+        cursor = conn.cursor()
+        try:
+            yield cursor
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.close()
+
+    @contextmanager
+    def _write_cursor(self, cursor=None):
+        """Reuse the caller's transaction cursor, or run in a transaction of our own."""
+        if cursor is not None:
+            yield cursor
+            return
+        with self.transaction() as own_cursor:
+            yield own_cursor
+
     def get_invoices(self, supplier_id=None, status=None, page=1, limit=10):
         conn = get_db_connection()
         cursor = get_cursor(conn)
@@ -53,54 +133,24 @@ class InvoiceDBService:
             'pages': (total + limit - 1) // limit
         }
 
-    def update_status(self, invoice_id, status, remarks=None, updated_by=None):
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        try:
-            query = """
-                UPDATE invoices 
-                SET status = %s, 
-                    remarks = COALESCE(%s, remarks),
-                    updated_by = COALESCE(%s, updated_by),
-                    updated_at = NOW()
-                WHERE invoice_id = %s
-            """
-            cursor.execute(query, (status, remarks, updated_by, invoice_id))
-            conn.commit()
-            return cursor.rowcount > 0
-        except Exception as err:
-            print(f"Error updating invoice: {err}")
-            conn.rollback()
-            return False
-        finally:
-            cursor.close()
-            conn.close()
-
-    def create_notification(self, supplier_id, type, subject, message, priority='medium'):
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
+    def create_notification(self, supplier_id, type, subject, message, priority='medium', cursor=None):
         try:
             query = """
                 INSERT INTO notifications 
                 (id, supplier_id, type, subject, message, priority, is_read, created_at)
                 VALUES (%s, %s, %s, %s, %s, %s, FALSE, NOW())
             """
-            # Generate a simple ID or let DB handle it if auto-increment
-            # For now, assuming string ID based on type and time
-            notif_id = f"notif_{int(datetime.now().timestamp())}"
+            # Random UUIDs cannot collide the way per-second timestamps did
+            notif_id = str(uuid.uuid4())
             
-            cursor.execute(query, (notif_id, supplier_id, type, subject, message, priority))
-            conn.commit()
+            with self._write_cursor(cursor) as cur:
+                cur.execute(query, (notif_id, supplier_id, type, subject, message, priority))
             return notif_id
-        except Exception as err:
-            print(f"Error creating notification: {err}")
-            conn.rollback()
+        except Exception:
+            if cursor is not None:
+                raise
+            logger.exception("Error creating notification")
             return None
-        finally:
-            cursor.close()
-            conn.close()
 
     def get_notifications_for_user(self, user_id):
         """Get all notifications for a specific user/persona."""
@@ -117,33 +167,62 @@ class InvoiceDBService:
             cursor.execute(query, (user_id, user_id))
             notifications = cursor.fetchall()
             return notifications
-        except Exception as err:
-            print(f"Error fetching notifications: {err}")
+        except Exception:
+            logger.exception("Error fetching notifications")
             return []
         finally:
             cursor.close()
             conn.close()
 
-    def create_notification_for_user(self, recipient_id, type, subject, message, priority='medium', related_invoice=None):
+    def create_notification_for_user(self, recipient_id, type, subject, message, priority='medium', related_invoice=None, cursor=None):
         """Create notification for a specific user/persona."""
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
         try:
             query = """
                 INSERT INTO notifications 
                 (id, recipient_id, supplier_id, type, subject, message, priority, is_read, related_invoice, created_at)
                 VALUES (%s, %s, %s, %s, %s, %s, %s, FALSE, %s, NOW())
             """
-            notif_id = f"notif_{int(datetime.now().timestamp())}"
+            notif_id = str(uuid.uuid4())
             
-            cursor.execute(query, (notif_id, recipient_id, recipient_id, type, subject, message, priority, related_invoice))
-            conn.commit()
+            with self._write_cursor(cursor) as cur:
+                cur.execute(query, (notif_id, recipient_id, recipient_id, type, subject, message, priority, related_invoice))
             return notif_id
-        except Exception as err:
-            print(f"Error creating notification for user: {err}")
-            conn.rollback()
+        except Exception:
+            if cursor is not None:
+                raise
+            logger.exception("Error creating notification for user")
             return None
+
+    def create_notifications_for_users(self, recipient_ids, type, subject, message, priority='medium', related_invoice=None):
+        """Fan out the same notification to many users with multi-row INSERTs. Returns the new ids."""
+        recipient_ids = list(recipient_ids or [])
+        if not recipient_ids:
+            return []
+
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        try:
+            query = """
+                INSERT INTO notifications 
+                (id, recipient_id, supplier_id, type, subject, message, priority, is_read, related_invoice, created_at)
+                VALUES %s
+            """
+            rows = [
+                (str(uuid.uuid4()), recipient_id, recipient_id, type, subject, message, priority, related_invoice)
+                for recipient_id in recipient_ids
+            ]
+            execute_values(
+                cursor, query, rows,
+                template="(%s, %s, %s, %s, %s, %s, %s, FALSE, %s, NOW())",
+                page_size=INSERT_BATCH_SIZE
+            )
+            conn.commit()
+            return [row[0] for row in rows]
+        except Exception:
+            logger.exception("Error creating notifications for %d users", len(recipient_ids))
+            conn.rollback()
+            return []
         finally:
             cursor.close()
             conn.close()
@@ -154,26 +233,17 @@ class InvoiceDBService:
         
         try:
             # Map to supplier_invoices table in schema.sql
+            # ON CONFLICT makes re-submission of the same id idempotent without a probe query first
             query = """
                 INSERT INTO supplier_invoices 
                 (id, invoice_number, supplier_id, amount, status, invoice_date, items, created_at)
                 VALUES (%s, %s, %s, %s, %s, %s, %s, NOW())
+                ON CONFLICT (id) DO NOTHING
             """
             
-            import json
-            
             # Serialize items
-            line_items_json = json.dumps(invoice_data.get('lineItems', []))
+            line_items_json = dumps_json(invoice_data.get('lineItems', []))
             
-            # Helper to parse amount string to float
-            def parse_amount(amt_str):
-                try:
-                    if isinstance(amt_str, (int, float)):
-                        return float(amt_str)
-                    return float(str(amt_str).replace(',', '').replace('₹', '').replace('$', '').strip())
-                except:
-                    return 0.0
-
             params = (
                 invoice_data.get('id') or str(uuid.uuid4()),
                 invoice_data.get('invoiceNumber'),
@@ -186,10 +256,10 @@ class InvoiceDBService:
             
             cursor.execute(query, params)
             conn.commit()
-            print(f"DEBUG: Invoice inserted into supplier_invoices: {invoice_data.get('invoiceNumber')}")
+            logger.debug("Invoice inserted into supplier_invoices: %s", invoice_data.get('invoiceNumber'))
             return True
-        except Exception as err:
-            print(f"Error creating invoice: {err}")
+        except Exception:
+            logger.exception("Error creating invoice")
             conn.rollback()
             return False
         finally:
@@ -211,33 +281,67 @@ class InvoiceDBService:
             cursor.execute(query)
             invoices = cursor.fetchall()
             return invoices
-        except Exception as err:
-            print(f"Error fetching pending invoices: {err}")
+        except Exception:
+            logger.exception("Error fetching pending invoices")
             return []
         finally:
             cursor.close()
             conn.close()
 
-    def update_status(self, invoice_id: str, status: str, remarks: str = None, updated_by: str = None):
+    def update_status(self, invoice_id: str, status: str, remarks: str = None, updated_by: str = None, cursor=None):
         """Update invoice status in MySQL database."""
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
         try:
             query = """
                 UPDATE supplier_invoices 
                 SET status = %s
                 WHERE id = %s OR invoice_number = %s
             """
-            cursor.execute(query, (status, invoice_id, invoice_id))
-            conn.commit()
+            with self._write_cursor(cursor) as cur:
+                cur.execute(query, (status, invoice_id, invoice_id))
+                rows_affected = cur.rowcount
             
-            rows_affected = cursor.rowcount
-            print(f"DEBUG: Updated invoice {invoice_id} to status {status}. Rows affected: {rows_affected}")
+            logger.debug("Updated invoice %s to status %s. Rows affected: %s", invoice_id, status, rows_affected)
             return rows_affected > 0
-        except Exception as err:
-            print(f"Error updating invoice status: {err}")
+        except Exception:
+            if cursor is not None:
+                raise
+            logger.exception("Error updating invoice status")
             return False
+
+    def update_statuses(self, updates):
+        """
+        Update many invoice statuses in one statement.
+
+        updates: iterable of (invoice_id, status) pairs; invoice_id may be the id or invoice_number.
+        Returns the number of rows affected.
+        """
+        updates = list(updates or [])
+        if not updates:
+            return 0
+        if len(updates) == 1:
+            invoice_id, status = updates[0]
+            return 1 if self.update_status(invoice_id, status) else 0
+
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        try:
+            case_clauses = ' '.join(['WHEN %s IN (id, invoice_number) THEN %s'] * len(updates))
+            placeholders = ','.join(['%s'] * len(updates))
+            query = f"""
+                UPDATE supplier_invoices
+                SET status = CASE {case_clauses} ELSE status END
+                WHERE id IN ({placeholders}) OR invoice_number IN ({placeholders})
+            """
+            ids = [invoice_id for invoice_id, _ in updates]
+            params = [value for pair in updates for value in pair] + ids + ids
+            cursor.execute(query, tuple(params))
+            conn.commit()
+            return cursor.rowcount
+        except Exception:
+            logger.exception("Error bulk updating invoice statuses")
+            conn.rollback()
+            return 0
         finally:
             cursor.close()
             conn.close()
@@ -257,8 +361,8 @@ class InvoiceDBService:
             cursor.execute(query, (supplier_id,))
             invoices = cursor.fetchall()
             return invoices
-        except Exception as err:
-            print(f"Error fetching supplier invoices: {err}")
+        except Exception:
+            logger.exception("Error fetching supplier invoices")
             return []
         finally:
             cursor.close()
@@ -297,8 +401,8 @@ class InvoiceDBService:
                 })
             
             return formatted_invoices
-        except Exception as err:
-            print(f"Error fetching all invoices: {err}")
+        except Exception:
+            logger.exception("Error fetching all invoices")
             return []
         finally:
             cursor.close()
@@ -323,31 +427,72 @@ class InvoiceDBService:
                 )
             """)
             conn.commit()
-            print("[DB] invoice_documents table ensured.")
-        except Exception as err:
-            print(f"Error creating invoice_documents table: {err}")
+            logger.info("invoice_documents table ensured")
+            return True
+        except Exception:
+            logger.exception("Error creating invoice_documents table")
+            return False
         finally:
             cursor.close()
             conn.close()
 
-    def save_document(self, invoice_id: str, doc_type: str, file_name: str, file_path: str, file_size: int = None, uploaded_by: str = None):
+    def save_document(self, invoice_id: str, doc_type: str, file_name: str, file_path: str, file_size: int = None, uploaded_by: str = None, cursor=None):
         """Save a document record linked to an invoice."""
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
         try:
             doc_id = str(uuid.uuid4())
             query = """
                 INSERT INTO invoice_documents (id, invoice_id, doc_type, file_name, file_path, file_size, uploaded_by)
                 VALUES (%s, %s, %s, %s, %s, %s, %s)
             """
-            cursor.execute(query, (doc_id, invoice_id, doc_type, file_name, file_path, file_size, uploaded_by))
-            conn.commit()
-            print(f"[DB] Saved document {doc_type} for invoice {invoice_id}")
+            with self._write_cursor(cursor) as cur:
+                cur.execute(query, (doc_id, invoice_id, doc_type, file_name, file_path, file_size, uploaded_by))
+            logger.debug("Saved document %s for invoice %s", doc_type, invoice_id)
             return doc_id
-        except Exception as err:
-            print(f"Error saving document: {err}")
+        except Exception:
+            if cursor is not None:
+                raise
+            logger.exception("Error saving document")
             return None
+
+    def save_documents(self, invoice_id: str, documents):
+        """
+        Save several document records for one invoice with multi-row INSERTs.
+
+        documents: iterable of dicts with doc_type, file_name, file_path and optional file_size, uploaded_by.
+        Returns the new document ids in input order.
+        """
+        documents = list(documents or [])
+        if not documents:
+            return []
+
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        try:
+            query = """
+                INSERT INTO invoice_documents (id, invoice_id, doc_type, file_name, file_path, file_size, uploaded_by)
+                VALUES %s
+            """
+            rows = [
+                (
+                    str(uuid.uuid4()),
+                    invoice_id,
+                    doc['doc_type'],
+                    doc['file_name'],
+                    doc['file_path'],
+                    doc.get('file_size'),
+                    doc.get('uploaded_by')
+                )
+                for doc in documents
+            ]
+            execute_values(cursor, query, rows, page_size=INSERT_BATCH_SIZE)
+            conn.commit()
+            logger.debug("Saved %d documents for invoice %s", len(rows), invoice_id)
+            return [row[0] for row in rows]
+        except Exception:
+            logger.exception("Error saving documents for invoice %s", invoice_id)
+            conn.rollback()
+            return []
         finally:
             cursor.close()
             conn.close()
@@ -372,14 +517,45 @@ class InvoiceDBService:
                     doc['uploaded_at'] = str(doc['uploaded_at'])
             
             return documents
-        except Exception as err:
-            print(f"Error fetching documents for invoice {invoice_id}: {err}")
+        except Exception:
+            logger.exception("Error fetching documents for invoice %s", invoice_id)
             return []
         finally:
             cursor.close()
             conn.close()
 
-invoice_db_service = InvoiceDBService()
+    def get_documents_for_invoices(self, invoice_ids):
+        """Get documents for many invoices in one query, grouped by invoice_id."""
+        grouped = defaultdict(list)
+        ids = list(dict.fromkeys(invoice_ids or []))
+        if not ids:
+            return {}
+
+        conn = get_db_connection()
+        cursor = get_cursor(conn)
 
-# Ensure the documents table exists on module load
-invoice_db_service.ensure_documents_table()
+        try:
+            # Chunk the IN-list so very large workbench pages stay under driver/server parameter limits
+            for start in range(0, len(ids), DOCUMENT_ID_CHUNK_SIZE):
+                chunk = ids[start:start + DOCUMENT_ID_CHUNK_SIZE]
+                placeholders = ','.join(['%s'] * len(chunk))
+                query = f"""
+                    SELECT * FROM invoice_documents
+                    WHERE invoice_id IN ({placeholders})
+                    ORDER BY uploaded_at DESC
+                """
+                cursor.execute(query, tuple(chunk))
+                for doc in cursor.fetchall():
+                    if doc.get('uploaded_at'):
+                        doc['uploaded_at'] = str(doc['uploaded_at'])
+                    grouped[doc['invoice_id']].append(doc)
+
+            return dict(grouped)
+        except Exception:
+            logger.exception("Error fetching documents for %d invoices", len(ids))
+            return {}
+        finally:
+            cursor.close()
+            conn.close()
+
+invoice_db_service = InvoiceDBService()
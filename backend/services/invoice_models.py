@@ -7,40 +7,192 @@ from OCR output using PaddleOCR PP-Structure.
 Author: SequelString AI Team
 """
 
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import date, datetime
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Tuple
 from pydantic import BaseModel, Field, field_validator, model_validator
 from decimal import Decimal
+from math import fsum
 import re
 
+# Optional: DFA regex engines for bulk validation of OCR batches
+try:
+    import hyperscan
+    HYPERSCAN_AVAILABLE = True
+except ImportError:
+    HYPERSCAN_AVAILABLE = False
+
+try:
+    import re2
+    RE2_AVAILABLE = True
+except ImportError:
+    RE2_AVAILABLE = False
+
 
 # ============================================================================
 # VALIDATION HELPERS
 # ============================================================================
 
+_GSTIN_PATTERN = r'[0-9]{2}[A-Z]{5}[0-9]{4}[A-Z]{1}[1-9A-Z]{1}Z[0-9A-Z]{1}'
+_PAN_PATTERN = r'[A-Z]{5}[0-9]{4}[A-Z]{1}'
+# Common formats: MH12AB1234, MH-12-AB-1234, MH 12 AB 1234
+_VEHICLE_PATTERN = r'[A-Z]{2}[\s\-]?[0-9]{1,2}[\s\-]?[A-Z]{0,3}[\s\-]?[0-9]{1,4}'
+
+# Compiled once at import; the validators run for every OCR'd invoice field
+_GSTIN_RE = re.compile(f'^{_GSTIN_PATTERN}$')
+_PAN_RE = re.compile(f'^{_PAN_PATTERN}$')
+_VEHICLE_RE = re.compile(f'^{_VEHICLE_PATTERN}$')
+# Deletion table for hyphens/spaces in vehicle numbers (one pass instead of chained replace)
+_VEHICLE_STRIP = str.maketrans('', '', '- ')
+
+
+def normalize_vehicle_number(vehicle: str) -> str:
+    """Uppercase a vehicle number and strip hyphens/spaces"""
+    return vehicle.upper().translate(_VEHICLE_STRIP)
+
+
 def validate_gstin(gstin: str) -> bool:
     """Validate Indian GSTIN format: 2 digit state code + 10 char PAN + 1 char + Z + 1 check digit"""
     if not gstin:
         return True  # Optional field
-    pattern = r'^[0-9]{2}[A-Z]{5}[0-9]{4}[A-Z]{1}[1-9A-Z]{1}Z[0-9A-Z]{1}$'
-    return bool(re.match(pattern, gstin.upper()))
+    return bool(_GSTIN_RE.match(gstin.upper()))
 
 
 def validate_pan(pan: str) -> bool:
     """Validate Indian PAN format: 5 letters + 4 digits + 1 letter"""
     if not pan:
         return True  # Optional field
-    pattern = r'^[A-Z]{5}[0-9]{4}[A-Z]{1}$'
-    return bool(re.match(pattern, pan.upper()))
+    return bool(_PAN_RE.match(pan.upper()))
 
 
 def validate_vehicle_number(vehicle: str) -> bool:
     """Validate Indian vehicle registration number format"""
     if not vehicle:
         return True
-    # Common formats: MH12AB1234, MH-12-AB-1234, MH 12 AB 1234
-    pattern = r'^[A-Z]{2}[\s\-]?[0-9]{1,2}[\s\-]?[A-Z]{0,3}[\s\-]?[0-9]{1,4}$'
-    return bool(re.match(pattern, vehicle.upper().replace('-', '').replace(' ', '')))
+    return bool(_VEHICLE_RE.match(normalize_vehicle_number(vehicle)))
+
+
+# ============================================================================
+# BULK VALIDATION (OCR batches)
+# ============================================================================
+
+# Field ids returned by validate_many (0 = no pattern matched)
+FIELD_NONE = 0
+FIELD_GSTIN = 1
+FIELD_PAN = 2
+FIELD_VEHICLE = 3
+
+_BULK_PATTERNS = (
+    (FIELD_GSTIN, _GSTIN_PATTERN),
+    (FIELD_PAN, _PAN_PATTERN),
+    (FIELD_VEHICLE, _VEHICLE_PATTERN),
+)
+
+# One alternation, one group per field id, so each string is scanned once
+_COMBINED_PATTERN = '^(?:' + '|'.join(f'({pattern})' for _, pattern in _BULK_PATTERNS) + ')$'
+_COMBINED_RE = (re2 if RE2_AVAILABLE else re).compile(_COMBINED_PATTERN)
+
+_hyperscan_db = None
+
+
+def _get_hyperscan_db():
+    """Compile the Hyperscan database on first use."""
+    global _hyperscan_db
+    if _hyperscan_db is None:
+        db = hyperscan.Database()
+        # Unanchored with leftmost start-of-match: _validate_many_hyperscan only accepts
+        # matches spanning exactly one value, which is what ^...$ means per value
+        db.compile(
+            expressions=[pattern.encode() for _, pattern in _BULK_PATTERNS],
+            ids=[field_id for field_id, _ in _BULK_PATTERNS],
+            flags=[hyperscan.HS_FLAG_SOM_LEFTMOST] * len(_BULK_PATTERNS),
+        )
+        _hyperscan_db = db
+    return _hyperscan_db
+
+
+def _validate_many_hyperscan(values: List[str]) -> List[int]:
+    """Scan all values in one Hyperscan pass over a NUL-separated buffer."""
+    result = [FIELD_NONE] * len(values)
+    spans = {}  # end offset -> (value index, start offset)
+    chunks = []
+    offset = 0
+    for index, value in enumerate(values):
+        encoded = value.upper().encode()
+        spans[offset + len(encoded)] = (index, offset)
+        chunks.append(encoded)
+        offset += len(encoded) + 1  # NUL separator: no pattern can match it
+
+    def on_match(field_id, start, end, flags, context):
+        span = spans.get(end)
+        if span is not None and span[1] == start:
+            index = span[0]
+            if result[index] == FIELD_NONE or field_id < result[index]:
+                result[index] = field_id
+        return False  # keep scanning
+
+    _get_hyperscan_db().scan(b'\0'.join(chunks), match_event_handler=on_match)
+    return result
+
+
+def validate_many(values: List[Optional[str]]) -> List[int]:
+    """
+    Classify a batch of OCR strings as GSTIN, PAN or vehicle number.
+
+    Returns one FIELD_* id per input (FIELD_NONE for empty or unmatched values).
+    Uses Hyperscan when installed, else a single combined RE2/re alternation.
+    Single-invoice paths should keep using validate_gstin / validate_pan.
+    """
+    values = [value or '' for value in values]
+    if HYPERSCAN_AVAILABLE and values:
+        return _validate_many_hyperscan(values)
+
+    result = []
+    for value in values:
+        match = _COMBINED_RE.match(value.upper()) if value else None
+        if match is None:
+            result.append(FIELD_NONE)
+        else:
+            result.append(next(i for i, group in enumerate(match.groups(), 1) if group is not None))
+    return result
+
+
+# ============================================================================
+# EXTRACTION TIMESTAMPS
+# ============================================================================
+
+# Set by extraction_batch(): one clock read shared by every model built in the batch
+_batch_now: ContextVar[Optional[datetime]] = ContextVar('_batch_now', default=None)
+
+# Last (timestamp, isoformat) pair; a batch shares one datetime object, so this hits for all but the first
+_last_iso: Tuple[Optional[datetime], str] = (None, '')
+
+
+@contextmanager
+def extraction_batch(now: Optional[datetime] = None):
+    """Stamp every FreightInvoice created inside the block with the same extraction_timestamp."""
+    token = _batch_now.set(now or datetime.now())
+    try:
+        yield _batch_now.get()
+    finally:
+        _batch_now.reset(token)
+
+
+def _extraction_now() -> datetime:
+    """default_factory for extraction_timestamp: the batch timestamp if one is active."""
+    return _batch_now.get() or datetime.now()
+
+
+def _timestamp_iso(ts: datetime) -> str:
+    """isoformat() with a one-entry identity cache for batch-shared timestamps."""
+    global _last_iso
+    cached = _last_iso
+    if cached[0] is ts:
+        return cached[1]
+    iso = ts.isoformat()
+    _last_iso = (ts, iso)
+    return iso
 
 
 # ============================================================================
@@ -93,8 +245,7 @@ class LineItem(BaseModel):
     def validate_vehicle(cls, v: Optional[str]) -> Optional[str]:
         if v:
             # Normalize vehicle number
-            normalized = v.upper().replace('-', '').replace(' ', '')
-            return normalized
+            return normalize_vehicle_number(v)
         return None
 
 
@@ -185,7 +336,7 @@ class FreightInvoice(BaseModel):
     
     # OCR Metadata
     confidence_score: float = Field(0.0, ge=0, le=1.0, description="Overall OCR confidence (0-1)")
-    extraction_timestamp: datetime = Field(default_factory=datetime.now, description="When data was extracted")
+    extraction_timestamp: datetime = Field(default_factory=_extraction_now, description="When data was extracted")
     source_file: Optional[str] = Field(None, description="Source file path")
     page_count: int = Field(1, ge=1, description="Number of pages")
     
@@ -207,7 +358,8 @@ class FreightInvoice(BaseModel):
         
         # Check subtotal vs line items
         if self.line_items:
-            line_total = sum(item.amount for item in self.line_items)
+            # fsum accumulates in C and avoids float drift across hundreds of items
+            line_total = fsum(item.amount for item in self.line_items)
             if abs(line_total - self.subtotal) > 1:  # Allow ₹1 tolerance
                 errors.append(f"Line items total ({line_total}) doesn't match subtotal ({self.subtotal})")
         
@@ -244,7 +396,7 @@ class FreightInvoice(BaseModel):
             'total_tax': self.tax_details.total_tax,
             'total_amount': self.total_amount,
             'confidence_score': self.confidence_score,
-            'extraction_timestamp': self.extraction_timestamp.isoformat(),
+            'extraction_timestamp': _timestamp_iso(self.extraction_timestamp),
             'source_file': self.source_file,
             'is_validated': self.is_validated,
         }
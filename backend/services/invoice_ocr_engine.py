@@ -14,19 +14,34 @@ Features:
 Author: SequelString AI Team
 """
 
+import io
 import os
 import re
 import time
 import logging
-from datetime import datetime, date
-from typing import Optional, List, Dict, Any, Tuple
+from datetime import date, datetime
+from typing import Optional, List, Dict, Any, Tuple, Pattern, BinaryIO, Union
 from pathlib import Path
 import tempfile
+import gc
+import hashlib
+import queue
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Optional linear-time (DFA) regex engine for field extraction over long OCR text
+try:
+    import re2
+    RE2_AVAILABLE = True
+except ImportError:
+    RE2_AVAILABLE = False
+
 # Poppler path (local installation)
 # Update this if you installed Poppler elsewhere
 POPPLER_PATH = os.path.join(
@@ -34,6 +49,45 @@ POPPLER_PATH = os.path.join(
     'poppler', 'poppler-24.02.0', 'Library', 'bin'
 )
 
+# Max pages OCR'd concurrently per PDF (Paddle inference releases the GIL). Paddle
+# predictors are not thread-safe, so each engine serves one page at a time (see
+# _process_image): two workers let one page's text OCR overlap the previous page's
+# table pass, and more would only queue on the engine locks
+OCR_PAGE_WORKERS = 2
+
+# PDF page rendering: 200dpi grayscale is ~4.5x fewer pixels than 300dpi RGB and
+# still gives PP-OCR's detector (trained around a 960px long side) plenty to work with
+PDF_RENDER_DPI = 200
+PDF_RENDER_FMT = 'jpeg'
+
+# Rendered pages buffered between the PDF->image producer and OCR; bounds resident images
+PDF_PAGE_QUEUE_SIZE = 2
+
+# CPU inference acceleration for PaddleOCR 2.x (oneDNN/MKL-DNN kernels + intra-op threads)
+OCR_ENABLE_MKLDNN = os.getenv('OCR_ENABLE_MKLDNN', 'true').lower() == 'true'
+OCR_CPU_THREADS = int(os.getenv('OCR_CPU_THREADS', min(8, os.cpu_count() or 1)))
+# OCR_CPU_THREADS is the total budget: up to OCR_PAGE_WORKERS predictors infer at once
+OCR_ENGINE_CPU_THREADS = max(1, OCR_CPU_THREADS // OCR_PAGE_WORKERS)
+
+# Text-line crops fed to the rec/cls predictors per inference call. 1 keeps RSS low on plain
+# CPUs; raise (e.g. 4-8) on GPU or AMX/AVX-512 hosts where larger batches fill the GEMMs.
+# Whole pages can't be batched: PaddleOCR 2.x only accepts image lists with det=False.
+OCR_REC_BATCH_NUM = int(os.getenv('OCR_REC_BATCH_NUM', 1))
+
+# Rebuild the PaddleOCR engines after this many pages; Paddle's native predictor
+# grows RSS without bound and re-instantiation is the known way to release it
+OCR_REINIT_EVERY_PAGES = 50
+
+# Pages with fewer lines carrying 3+ digits skip the PP-Structure table pass
+MIN_TABLE_NUMERIC_LINES = 2
+
+# OCR result cache keyed by file-content hash: in-process LRU, plus an opt-in on-disk layer
+OCR_CACHE_SIZE = int(os.getenv('OCR_CACHE_SIZE', 128))
+OCR_CACHE_DIR = os.getenv('OCR_CACHE_DIR')  # e.g. /tmp/ocr_cache; unset = memory only
+# Bounds for the on-disk layer: oldest entries are pruned past the count, stale ones past the age
+OCR_CACHE_DISK_MAX_ENTRIES = int(os.getenv('OCR_CACHE_DISK_MAX_ENTRIES', 2000))
+OCR_CACHE_DISK_MAX_AGE_S = int(os.getenv('OCR_CACHE_DISK_MAX_AGE_S', 7 * 24 * 3600))
+
 # Lazy imports for heavy dependencies
 _paddleocr = None
 _pdf2image = None
@@ -81,8 +135,12 @@ def get_pdf2image():
     global _pdf2image
     if _pdf2image is None:
         try:
-            from pdf2image import convert_from_path, convert_from_bytes
-            _pdf2image = {'convert_from_path': convert_from_path, 'convert_from_bytes': convert_from_bytes}
+            from pdf2image import convert_from_path, convert_from_bytes, pdfinfo_from_path
+            _pdf2image = {
+                'convert_from_path': convert_from_path,
+                'convert_from_bytes': convert_from_bytes,
+                'pdfinfo_from_path': pdfinfo_from_path,
+            }
             logger.info("pdf2image loaded successfully")
         except ImportError:
             logger.error("pdf2image not installed. Run: pip install pdf2image")
@@ -107,7 +165,7 @@ def get_pil():
 # Import Pydantic models
 from .invoice_models import (
     FreightInvoice, LineItem, TaxDetails, VendorDetails, 
-    ShipmentDetails, OCRExtractionResult
+    ShipmentDetails, OCRExtractionResult, extraction_batch
 )
 
 
@@ -115,7 +173,7 @@ from .invoice_models import (
 # REGEX PATTERNS FOR FIELD EXTRACTION
 # ============================================================================
 
-PATTERNS = {
+_RAW_PATTERNS = {
     # Invoice identification
     'invoice_number': [
         r'(?:Invoice\s*(?:No|Number|#|:)\s*[:\s]?\s*)([A-Z0-9\-\/]+)',
@@ -182,6 +240,286 @@ PATTERNS = {
     ],
 }
 
+# Compiled once at import so field extraction skips the re cache lookup + flag parsing per call
+PATTERN_FLAGS = re.IGNORECASE | re.MULTILINE
+
+
+def _compile_pattern(pattern: str) -> Pattern:
+    """Compile with RE2 when available (no backtracking blow-ups on long pages), else stdlib re."""
+    if RE2_AVAILABLE:
+        try:
+            # google-re2 takes an re2.Options object, not re-style flag ints; inline
+            # flags give the same IGNORECASE | MULTILINE semantics as PATTERN_FLAGS
+            return re2.compile(f'(?im){pattern}')
+        except Exception as e:
+            logger.warning(f"RE2 rejected pattern, using re: {pattern!r} ({e})")
+    return re.compile(pattern, PATTERN_FLAGS)
+
+
+PATTERNS: Dict[str, List[Pattern]] = {
+    field: [_compile_pattern(pattern) for pattern in patterns]
+    for field, patterns in _RAW_PATTERNS.items()
+}
+
+
+# Characters dropped from OCR'd amounts (separators, rupee sign, whitespace) in one C-level pass
+_MONEY_DELETE = str.maketrans('', '', ',₹ \t')
+
+
+def _money_str(value: str) -> str:
+    """Strip separators/currency/whitespace from an OCR'd amount"""
+    return value.translate(_MONEY_DELETE)
+
+
+def _parse_money(value: str) -> float:
+    """float() of an OCR'd amount such as '₹ 1,23,456.00'; raises ValueError if not numeric"""
+    return float(_money_str(value))
+
+
+# Line-item column roles in header-match priority order
+_COL_ROLES = (
+    ('amount', ('amount', 'total')),
+    ('description', ('description', 'particular', 'item')),
+    ('rate', ('rate', 'price')),
+    ('qty', ('qty', 'quantity')),
+)
+
+
+# dd/mm/yyyy, dd-mm-yy, dd.mm.yyyy ... (same separator twice, 2- or 4-digit year)
+_DATE_RE = re.compile(r'^(\d{1,2})([-/.])(\d{1,2})\2(\d{4}|\d{2})$')
+
+
+def parse_invoice_date(date_str: str) -> Optional[date]:
+    """
+    Parse a day-first invoice date with one regex instead of looping strptime formats.
+    
+    Two-digit years pivot like strptime's %y: 69-99 -> 19xx, 00-68 -> 20xx.
+    """
+    match = _DATE_RE.match(date_str.strip())
+    if not match:
+        return None
+    day, _, month, year = match.groups()
+    year_num = int(year)
+    if len(year) == 2:
+        year_num += 1900 if year_num >= 69 else 2000
+    try:
+        return date(year_num, int(month), int(day))
+    except ValueError:
+        return None
+
+
+class PatternUnion:
+    """
+    A field's alternative patterns merged into one alternation, scanned in a single pass.
+
+    Priority follows list order, as with trying each pattern in turn: a match of
+    alternative 0 returns immediately, otherwise the highest-priority match seen
+    during the scan wins. Every raw pattern captures its value in group 1.
+
+    ``keywords`` are lowercase literals at least one of which every alternative
+    needs; when the caller passes the lowercased page and none occur, the regex
+    scan is skipped entirely.
+    """
+
+    def __init__(self, patterns: List[str], keywords: Tuple[str, ...] = ()):
+        self.keywords = keywords
+        parts = []
+        self._outer_groups = []
+        group = 1
+        for pattern in patterns:
+            # Wrap each alternative in its own group so we can tell which one matched
+            self._outer_groups.append(group)
+            parts.append(f'({pattern})')
+            group += 1 + re.compile(pattern).groups
+        self.regex = _compile_pattern('|'.join(parts))
+
+    def extract(self, text: str, lowered: Optional[str] = None) -> Optional[str]:
+        """Return group 1 of the highest-priority alternative that matches, or None."""
+        if lowered is not None and self.keywords and not any(k in lowered for k in self.keywords):
+            return None
+        best_priority = len(self._outer_groups)
+        best_value = None
+        for match in self.regex.finditer(text):
+            for priority, outer in enumerate(self._outer_groups[:best_priority]):
+                if match.group(outer) is not None:
+                    best_priority = priority
+                    best_value = match.group(outer + 1)
+                    break
+            if best_priority == 0:
+                break
+        return best_value
+
+
+# Literal prefilters: a field whose keywords are all absent from the page can't match.
+# Fields without an entry (destination's bare "To", total's standalone-number fallback) always scan.
+FIELD_KEYWORDS: Dict[str, Tuple[str, ...]] = {
+    'invoice_number': ('invoice', 'bill'),
+    'invoice_date': ('date', 'dt'),
+    'due_date': ('due',),
+    'gstin': ('gst',),
+    'pan': ('pan',),
+    'lr_number': ('lr', 'cn', 'consignment', 'lorry', 'docket'),
+    'vehicle_number': ('veh', 'truck'),
+    'weight': ('kg',),
+    'origin': ('from', 'origin', 'source', 'pickup'),
+    'subtotal': ('sub', 'taxable'),
+}
+
+# One-pass unions for single-value fields; tax patterns stay as lists since they capture (rate, amount) pairs
+FIELD_PATTERNS: Dict[str, PatternUnion] = {
+    field: PatternUnion(patterns, FIELD_KEYWORDS.get(field, ()))
+    for field, patterns in _RAW_PATTERNS.items()
+    if field not in ('cgst', 'sgst', 'igst')
+}
+
+
+# Character-class bits for the fixed-shape token scanner (case-insensitive, as the regexes are)
+_DIGIT, _ALPHA = 1, 2
+_ALNUM = _DIGIT | _ALPHA
+
+# Per-position classes: GSTIN is 2 digits, 5 letters, 4 digits, letter, [1-9A-Z], 'Z', [0-9A-Z];
+# PAN is 5 letters, 4 digits, letter. Looser than the regexes, so a miss is conclusive.
+GSTIN_SHAPE = (_DIGIT,) * 2 + (_ALPHA,) * 5 + (_DIGIT,) * 4 + (_ALPHA, _ALNUM, _ALPHA, _ALNUM)
+PAN_SHAPE = (_ALPHA,) * 5 + (_DIGIT,) * 4 + (_ALPHA,)
+
+
+@lru_cache(maxsize=1)
+def _char_class_lut():
+    """256-entry byte -> class-bits table"""
+    import numpy as np
+    lut = np.zeros(256, dtype=np.uint8)
+    lut[ord('0'):ord('9') + 1] = _DIGIT
+    lut[ord('A'):ord('Z') + 1] = _ALPHA
+    lut[ord('a'):ord('z') + 1] = _ALPHA
+    return lut
+
+
+def char_classes(text: str):
+    """Class bits for every ASCII character of text (non-ASCII dropped), for has_token_shape"""
+    import numpy as np
+    return _char_class_lut()[np.frombuffer(text.encode('ascii', 'ignore'), dtype=np.uint8)]
+
+
+def has_token_shape(classes, shape: Tuple[int, ...]) -> bool:
+    """
+    True if some window of len(shape) consecutive characters matches the class sequence.
+    
+    One vectorised AND per token position instead of a backtracking regex scan of the page.
+    """
+    windows = len(classes) - len(shape) + 1
+    if windows <= 0:
+        return False
+    ok = (classes[:windows] & shape[0]) != 0
+    for offset, required in enumerate(shape[1:], 1):
+        ok &= (classes[offset:offset + windows] & required) != 0
+    return bool(ok.any())
+
+
+def _hash_bytes(data: bytes) -> str:
+    """Content digest used as the OCR cache key"""
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+def _hash_file(path: str) -> str:
+    """Content digest of a file, read in 1 MiB chunks"""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class OCRResultCache:
+    """
+    Thread-safe LRU of successful OCRExtractionResults, keyed by content hash + OCR config.
+    
+    Hands out deep copies so callers can't mutate cached entries. When a directory is
+    given, entries are also persisted as JSON and survive restarts; the directory is
+    capped at max_disk_entries files and entries older than max_disk_age_s are dropped.
+    """
+    
+    def __init__(self, max_size: int = OCR_CACHE_SIZE, cache_dir: Optional[str] = OCR_CACHE_DIR,
+                 max_disk_entries: int = OCR_CACHE_DISK_MAX_ENTRIES,
+                 max_disk_age_s: int = OCR_CACHE_DISK_MAX_AGE_S):
+        self.max_size = max_size
+        self.cache_dir = cache_dir
+        self.max_disk_entries = max_disk_entries
+        self.max_disk_age_s = max_disk_age_s
+        self._entries: "OrderedDict[str, OCRExtractionResult]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+    
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key.replace(':', '_')}.json")
+    
+    def get(self, key: str) -> Optional[OCRExtractionResult]:
+        with self._lock:
+            result = self._entries.get(key)
+            if result is not None:
+                self._entries.move_to_end(key)
+                return result.model_copy(deep=True)
+        
+        if self.cache_dir:
+            path = self._disk_path(key)
+            try:
+                if time.time() - os.path.getmtime(path) > self.max_disk_age_s:
+                    os.remove(path)
+                    return None
+                with open(path, 'r', encoding='utf-8') as f:
+                    result = OCRExtractionResult.model_validate_json(f.read())
+                os.utime(path)  # mtime doubles as last-use time for pruning
+                self._remember(key, result)
+                return result.model_copy(deep=True)
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable OCR cache entry {key}: {e}")
+        return None
+    
+    def put(self, key: str, result: OCRExtractionResult):
+        result = result.model_copy(deep=True)
+        self._remember(key, result)
+        if self.cache_dir:
+            try:
+                with open(self._disk_path(key), 'w', encoding='utf-8') as f:
+                    f.write(result.model_dump_json())
+                self._prune_disk()
+            except OSError as e:
+                logger.warning(f"Could not persist OCR cache entry {key}: {e}")
+    
+    def _remember(self, key: str, result: OCRExtractionResult):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def _prune_disk(self):
+        """Drop expired entries, then the least recently used ones beyond max_disk_entries."""
+        with self._disk_lock:
+            entries = []
+            for entry in os.scandir(self.cache_dir):
+                if entry.name.endswith('.json'):
+                    try:
+                        entries.append((entry.stat().st_mtime, entry.path))
+                    except FileNotFoundError:
+                        continue
+            entries.sort()
+            cutoff = time.time() - self.max_disk_age_s
+            excess = len(entries) - self.max_disk_entries
+            for i, (mtime, path) in enumerate(entries):
+                if i >= excess and mtime >= cutoff:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+
+_result_cache = OCRResultCache()
+
 
 class InvoiceOCREngine:
     """
@@ -203,72 +541,138 @@ class InvoiceOCREngine:
         self._ocr = None
         self._table_engine = None
         self._initialized = False
+        # Guards engine (re)construction; the singleton is shared across requests and page workers
+        self._engine_lock = threading.RLock()
+        # One inference at a time per engine; Paddle predictors are not thread-safe
+        self._ocr_lock = threading.Lock()
+        self._table_lock = threading.Lock()
+        self._pages_since_reinit = 0
         
+    def _cpu_inference_kwargs(self) -> Dict[str, Any]:
+        """Backend options for CPU inference; empty on GPU where Paddle picks its own kernels."""
+        if self.use_gpu:
+            return {}
+        return {
+            'enable_mkldnn': OCR_ENABLE_MKLDNN,
+            'cpu_threads': OCR_ENGINE_CPU_THREADS,
+        }
+    
+    @staticmethod
+    def _is_reinit_error(e: Exception) -> bool:
+        """Paddle refuses to rebuild some global state once it exists; those errors are recoverable."""
+        return 'already been initialized' in str(e) or 'Reinitialization' in str(e)
+    
     def _init_engines(self):
-        """Lazy initialization of OCR engines"""
+        """Lazy initialization of OCR engines (double-checked, so only one thread ever builds them)"""
         if self._initialized:
             return
-            
-        try:
-            paddle = get_paddleocr()
-            
-            # Check if we're using tesseract fallback
-            if paddle.get('fallback'):
-                logger.info("Using pytesseract fallback - skipping PaddleOCR/PPStructure init")
-                self._ocr = None
-                self._table_engine = None
-                self._use_tesseract = True
-                self._tesseract = paddle['pytesseract']
-                self._initialized = True
+        
+        with self._engine_lock:
+            if self._initialized:
                 return
             
-            self._use_tesseract = False
-            
-            # Main OCR engine - wrap in try/except for reinitialization issues
             try:
-                self._ocr = paddle['PaddleOCR'](
-                    use_angle_cls=True,
-                    lang=self.lang,
-                    use_gpu=self.use_gpu,
-                    show_log=False,
-                    det_model_dir=None,  # Use default
-                    rec_model_dir=None,  # Use default
-                )
-            except Exception as e:
-                if 'already been initialized' in str(e) or 'Reinitialization' in str(e):
-                    logger.warning("PaddleOCR already initialized, reusing existing instance")
-                    # Try to get existing instance or create minimal one
+                paddle = get_paddleocr()
+                
+                # Check if we're using tesseract fallback
+                if paddle.get('fallback'):
+                    logger.info("Using pytesseract fallback - skipping PaddleOCR/PPStructure init")
+                    self._ocr = None
+                    self._table_engine = None
+                    self._use_tesseract = True
+                    self._tesseract = paddle['pytesseract']
+                    self._initialized = True
+                    return
+                
+                self._use_tesseract = False
+                
+                # Main OCR engine - wrap in try/except for reinitialization issues
+                # (engines are rebuilt every OCR_REINIT_EVERY_PAGES pages, see _count_page_for_recycle)
+                try:
                     self._ocr = paddle['PaddleOCR'](
                         use_angle_cls=True,
                         lang=self.lang,
                         use_gpu=self.use_gpu,
                         show_log=False,
+                        det_model_dir=None,  # Use default
+                        rec_model_dir=None,  # Use default
+                        # On CPU batches run sequentially inside predictor.run() anyway;
+                        # batch size 1 (the default) keeps Paddle's memory arena (and RSS) small
+                        rec_batch_num=OCR_REC_BATCH_NUM,
+                        cls_batch_num=OCR_REC_BATCH_NUM,
+                        **self._cpu_inference_kwargs(),
                     )
-                else:
-                    raise
-            
-            # Table structure engine - also handle reinitialization
-            try:
-                self._table_engine = paddle['PPStructure'](
-                    table=True,
-                    ocr=True,
-                    show_log=False,
-                    use_gpu=self.use_gpu,
-                    lang=self.lang,
-                )
+                except Exception as e:
+                    if self._is_reinit_error(e):
+                        logger.warning("PaddleOCR already initialized, reusing existing instance")
+                        # Try to get existing instance or create minimal one
+                        self._ocr = paddle['PaddleOCR'](
+                            use_angle_cls=True,
+                            lang=self.lang,
+                            use_gpu=self.use_gpu,
+                            show_log=False,
+                        )
+                    else:
+                        raise
+                
+                # Table structure engine - also handle reinitialization
+                try:
+                    self._table_engine = paddle['PPStructure'](
+                        table=True,
+                        ocr=True,
+                        show_log=False,
+                        use_gpu=self.use_gpu,
+                        lang=self.lang,
+                        **self._cpu_inference_kwargs(),
+                    )
+                except Exception as e:
+                    if self._is_reinit_error(e):
+                        logger.warning("PPStructure already initialized, skipping table engine")
+                        self._table_engine = None
+                    else:
+                        raise
+                
+                self._initialized = True
+                logger.info("OCR engines initialized successfully")
+                
             except Exception as e:
-                if 'already been initialized' in str(e) or 'Reinitialization' in str(e):
-                    logger.warning("PPStructure already initialized, skipping table engine")
-                    self._table_engine = None
-                else:
-                    raise
-            
-            self._initialized = True
-            logger.info("OCR engines initialized successfully")
-            
-        except Exception as e:
-            logger.error(f"Failed to initialize OCR: {e}")
-            raise
+                logger.error(f"Failed to initialize OCR: {e}")
+                raise
+    
+    def _cache_config_key(self) -> str:
+        """Short digest of every setting that changes OCR output, so a config change misses the cache."""
+        try:
+            backend = 'tesseract' if get_paddleocr().get('fallback') else 'paddle'
+        except ImportError:
+            backend = 'none'  # compute() reports the failure; nothing gets cached
+        config = (
+            f"{backend}|{self.lang}|dpi={PDF_RENDER_DPI}|fmt={PDF_RENDER_FMT}"
+            f"|rec_batch={OCR_REC_BATCH_NUM}|table_min_lines={MIN_TABLE_NUMERIC_LINES}"
+        )
+        return hashlib.blake2b(config.encode(), digest_size=8).hexdigest()
+    
+    def _cached_extract(self, digest: str, source: Optional[str], compute) -> OCRExtractionResult:
+        """Return a cached result for this content, or run compute() and cache it if it succeeded."""
+        start_time = time.time()
+        key = f"{digest}:{self._cache_config_key()}"
+        cached = _result_cache.get(key)
+        if cached is not None:
+            logger.info(f"OCR cache hit for {source or digest}")
+            # Timings and timestamps describe this call, not the run that filled the cache
+            cached.processing_time_ms = int((time.time() - start_time) * 1000)
+            if cached.invoice is not None:
+                cached.invoice.extraction_timestamp = datetime.now()
+                if source:
+                    cached.invoice.source_file = source
+            return cached
+        
+        # One clock read per extraction: every model built for this file, across all of
+        # a PDF's pages, carries the same extraction_timestamp
+        with extraction_batch():
+            result = compute()
+        if result.success:
+            _result_cache.put(key, result)
+        return result
     
     def extract_from_pdf(self, pdf_path: str) -> OCRExtractionResult:
         """
@@ -280,40 +684,76 @@ class InvoiceOCREngine:
         Returns:
             OCRExtractionResult with extracted data
         """
+        return self._cached_extract(_hash_file(pdf_path), pdf_path, lambda: self._extract_pdf(pdf_path))
+    
+    def _extract_pdf(self, pdf_path: str) -> OCRExtractionResult:
+        """Uncached PDF extraction (see extract_from_pdf)"""
         start_time = time.time()
         errors = []
         warnings = []
         
         try:
-            # Convert PDF to images
-            pdf2img = get_pdf2image()
-            
             # Use local Poppler installation
             poppler_path = POPPLER_PATH if os.path.exists(POPPLER_PATH) else None
             
-            images = pdf2img['convert_from_path'](
-                pdf_path,
-                dpi=300,
-                fmt='png',
-                poppler_path=poppler_path
+            # Render pages in a producer thread while OCR consumes them, so conversion
+            # overlaps OCR and only a few page images are resident at any time
+            page_queue = queue.Queue(maxsize=PDF_PAGE_QUEUE_SIZE)
+            stop = threading.Event()
+            producer = threading.Thread(
+                target=self._render_pdf_pages,
+                args=(pdf_path, poppler_path, page_queue, stop),
+                daemon=True
             )
+            producer.start()
             
-            logger.info(f"Converted PDF to {len(images)} images")
+            in_flight = threading.BoundedSemaphore(OCR_PAGE_WORKERS)
+            futures = []
+            # Everything after start() is under the finally, so the producer always stops
+            try:
+                # Build engines while the first page renders
+                self._init_engines()
+                
+                with ThreadPoolExecutor(max_workers=OCR_PAGE_WORKERS) as executor:
+                    while True:
+                        image = page_queue.get()
+                        if image is None:
+                            break
+                        if isinstance(image, Exception):
+                            raise image
+                        in_flight.acquire()
+                        future = executor.submit(self._process_page, image)
+                        future.add_done_callback(lambda _: in_flight.release())
+                        futures.append(future)
+                        del image  # the worker owns the page now
+            finally:
+                stop.set()
+                # Free pages rendered but never consumed (engine init or a page failed)
+                while True:
+                    try:
+                        leftover = page_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if hasattr(leftover, 'close'):
+                        leftover.close()
             
-            # Process each page
-            all_text = []
-            all_tables = []
-            page_confidences = []
+            page_count = len(futures)
+            logger.info(f"OCR'd {page_count} PDF pages")
             
-            for i, image in enumerate(images):
-                page_result = self._process_image(image)
-                all_text.append(page_result['text'])
+            # Page count is known now, so size the per-page outputs up front
+            import numpy as np
+            all_text = [None] * page_count
+            all_tables = []
+            page_confidences = np.empty(page_count, dtype=np.float64)
+            for i, future in enumerate(futures):
+                page_result = future.result()
+                all_text[i] = page_result['text']
                 all_tables.extend(page_result['tables'])
-                page_confidences.append(page_result['confidence'])
+                page_confidences[i] = page_result['confidence']
                 
             # Combine results
             combined_text = '\n\n--- PAGE BREAK ---\n\n'.join(all_text)
-            avg_confidence = sum(page_confidences) / len(page_confidences) if page_confidences else 0
+            avg_confidence = float(page_confidences.mean()) if page_count else 0
             
             # Extract structured data
             invoice = self._extract_invoice_data(
@@ -321,7 +761,7 @@ class InvoiceOCREngine:
                 all_tables, 
                 avg_confidence,
                 pdf_path,
-                len(images)
+                page_count
             )
             
             processing_time = int((time.time() - start_time) * 1000)
@@ -345,6 +785,45 @@ class InvoiceOCREngine:
                 processing_time_ms=int((time.time() - start_time) * 1000)
             )
     
+    def _render_pdf_pages(self, pdf_path: str, poppler_path: Optional[str], page_queue: queue.Queue, stop: threading.Event):
+        """
+        Producer for extract_from_pdf: render one page at a time into page_queue.
+        
+        Puts each PIL image, then an exception if rendering failed, then a None sentinel.
+        Gives up quietly once stop is set (consumer bailed out).
+        """
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    page_queue.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        try:
+            pdf2img = get_pdf2image()
+            page_count = pdf2img['pdfinfo_from_path'](pdf_path, poppler_path=poppler_path)['Pages']
+            for page_no in range(1, page_count + 1):
+                pages = pdf2img['convert_from_path'](
+                    pdf_path,
+                    dpi=PDF_RENDER_DPI,
+                    fmt=PDF_RENDER_FMT,
+                    grayscale=True,
+                    first_page=page_no,
+                    last_page=page_no,
+                    poppler_path=poppler_path,
+                    use_pdftocairo=True
+                )
+                for image in pages:
+                    if not put(image):
+                        return
+        except Exception as e:
+            logger.error(f"PDF page rendering failed: {e}")
+            put(e)
+        finally:
+            put(None)
+    
     def extract_from_image(self, image_path: str) -> OCRExtractionResult:
         """
         Extract invoice data from image file
@@ -355,19 +834,30 @@ class InvoiceOCREngine:
         Returns:
             OCRExtractionResult with extracted data
         """
+        return self._cached_extract(
+            _hash_file(image_path),
+            image_path,
+            lambda: self._extract_image(image_path, image_path)
+        )
+    
+    def _extract_image(self, image_file: Union[str, BinaryIO], source_file: str) -> OCRExtractionResult:
+        """
+        Uncached image extraction (see extract_from_image)
+        
+        image_file is anything PIL.Image.open accepts: a path, or an in-memory buffer for uploads.
+        """
         start_time = time.time()
         
         try:
             Image = get_pil()
-            image = Image.open(image_path)
-            
-            result = self._process_image(image)
+            with Image.open(image_file) as image:
+                result = self._process_image(image)
             
             invoice = self._extract_invoice_data(
                 result['text'],
                 result['tables'],
                 result['confidence'],
-                image_path,
+                source_file,
                 1
             )
             
@@ -401,18 +891,28 @@ class InvoiceOCREngine:
         Returns:
             OCRExtractionResult
         """
-        # Save to temp file
+        # Hash before touching disk so re-uploads/retries skip the temp file and OCR entirely
+        return self._cached_extract(
+            _hash_bytes(file_bytes),
+            filename,
+            lambda: self._extract_bytes(file_bytes, filename)
+        )
+    
+    def _extract_bytes(self, file_bytes: bytes, filename: str) -> OCRExtractionResult:
+        """Uncached extraction from bytes (see extract_from_bytes)"""
         suffix = Path(filename).suffix.lower()
+        if suffix != '.pdf':
+            # Images decode straight from memory - no temp file write/read
+            return self._extract_image(io.BytesIO(file_bytes), filename)
         
+        # PDFs go through a temp file: Poppler reads from disk (pdf2image's
+        # convert_from_bytes writes one internally anyway), and pages are rendered lazily from it
         with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
             tmp.write(file_bytes)
             tmp_path = tmp.name
         
         try:
-            if suffix == '.pdf':
-                return self.extract_from_pdf(tmp_path)
-            else:
-                return self.extract_from_image(tmp_path)
+            return self._extract_pdf(tmp_path)
         finally:
             # Cleanup temp file
             try:
@@ -420,6 +920,13 @@ class InvoiceOCREngine:
             except:
                 pass
     
+    def _process_page(self, image) -> Dict[str, Any]:
+        """OCR one rendered PDF page, then free its pixel buffer right away"""
+        try:
+            return self._process_image(image)
+        finally:
+            image.close()
+    
     def _process_image(self, image) -> Dict[str, Any]:
         """
         Process single image with OCR
@@ -427,11 +934,18 @@ class InvoiceOCREngine:
         Returns:
             Dict with 'text', 'tables', 'confidence'
         """
-        self._init_engines()
+        with self._engine_lock:
+            self._init_engines()
+            # Hold local references so a concurrent recycle can't pull the engines out mid-page
+            ocr, table_engine = self._ocr, self._table_engine
         
-        # Convert PIL Image to numpy array
+        # Convert PIL Image to numpy array; asarray wraps PIL's exported buffer instead of copying it again
         import numpy as np
-        img_array = np.array(image)
+        img_array = np.asarray(image)
+        if img_array.ndim == 2:
+            # Grayscale PDF renders: detector/table models expect 3 channels. Materialised rather than
+            # a broadcast_to view - OpenCV preprocessing rejects read-only, zero-stride arrays.
+            img_array = np.repeat(img_array[..., None], 3, axis=-1)
         
         # TESSERACT FALLBACK MODE
         if hasattr(self, '_use_tesseract') and self._use_tesseract:
@@ -455,37 +969,37 @@ class InvoiceOCREngine:
         
         # PADDLEOCR MODE (original code)
         # Run text OCR
-        ocr_result = self._ocr.ocr(img_array, cls=True)
-        
-        # Extract text and confidence
-        text_lines = []
-        confidences = []
+        with self._ocr_lock:
+            ocr_result = ocr.ocr(img_array, cls=True)
         
-        if ocr_result and ocr_result[0]:
-            for line in ocr_result[0]:
-                if line and len(line) >= 2:
-                    text = line[1][0]
-                    conf = line[1][1]
-                    text_lines.append(text)
-                    confidences.append(conf)
+        # Extract text and confidence: each line is [box, (text, confidence)]
+        lines = [line for line in ocr_result[0] if line and len(line) >= 2] if ocr_result and ocr_result[0] else []
+        text_lines = [line[1][0] for line in lines]
+        confidences = np.fromiter((line[1][1] for line in lines), dtype=np.float64, count=len(lines))
         
         full_text = '\n'.join(text_lines)
-        avg_confidence = sum(confidences) / len(confidences) if confidences else 0
+        avg_confidence = float(confidences.mean()) if len(lines) else 0
         
-        # Run table extraction
+        # Run table extraction - skipped on pages without at least two numeric rows
+        # (cover letters, T&Cs, annexures), which can't hold a line-item table
         tables = []
-        try:
-            table_result = self._table_engine(img_array)
-            for item in table_result:
-                if item.get('type') == 'table' and 'res' in item:
-                    # Extract table structure
-                    if 'html' in item['res']:
-                        # Parse HTML table
-                        table_data = self._parse_html_table(item['res']['html'])
-                        if table_data:
-                            tables.append(table_data)
-        except Exception as e:
-            logger.warning(f"Table extraction failed: {e}")
+        numeric_lines = sum(1 for line in text_lines if sum(c.isdigit() for c in line) >= 3)
+        if numeric_lines >= MIN_TABLE_NUMERIC_LINES:
+            try:
+                with self._table_lock:
+                    table_result = table_engine(img_array)
+                for item in table_result:
+                    if item.get('type') == 'table' and 'res' in item:
+                        # Extract table structure
+                        if 'html' in item['res']:
+                            # Parse HTML table
+                            table_data = self._parse_html_table(item['res']['html'])
+                            if table_data:
+                                tables.append(table_data)
+            except Exception as e:
+                logger.warning(f"Table extraction failed: {e}")
+        
+        self._count_page_for_recycle()
         
         return {
             'text': full_text,
@@ -493,41 +1007,32 @@ class InvoiceOCREngine:
             'confidence': avg_confidence
         }
     
+    def _count_page_for_recycle(self):
+        """Drop the Paddle engines every OCR_REINIT_EVERY_PAGES pages; the next page rebuilds them."""
+        with self._engine_lock:
+            self._pages_since_reinit += 1
+            if self._pages_since_reinit < OCR_REINIT_EVERY_PAGES:
+                return
+            logger.info(f"Recycling PaddleOCR engines after {self._pages_since_reinit} pages")
+            self._ocr = None
+            self._table_engine = None
+            self._initialized = False
+            self._pages_since_reinit = 0
+        gc.collect()
+    
     def _parse_html_table(self, html: str) -> List[List[str]]:
         """Parse HTML table to 2D list"""
         try:
-            from html.parser import HTMLParser
-            
-            class TableParser(HTMLParser):
-                def __init__(self):
-                    super().__init__()
-                    self.rows = []
-                    self.current_row = []
-                    self.current_cell = ''
-                    self.in_cell = False
-                    
-                def handle_starttag(self, tag, attrs):
-                    if tag in ('td', 'th'):
-                        self.in_cell = True
-                        self.current_cell = ''
-                    elif tag == 'tr':
-                        self.current_row = []
-                        
-                def handle_endtag(self, tag):
-                    if tag in ('td', 'th'):
-                        self.in_cell = False
-                        self.current_row.append(self.current_cell.strip())
-                    elif tag == 'tr':
-                        if self.current_row:
-                            self.rows.append(self.current_row)
-                            
-                def handle_data(self, data):
-                    if self.in_cell:
-                        self.current_cell += data
+            # lxml ships with paddleocr (PP-Structure is the only source of these tables)
+            from lxml import html as lxml_html
             
-            parser = TableParser()
-            parser.feed(html)
-            return parser.rows
+            tree = lxml_html.fromstring(html)
+            rows = []
+            for tr in tree.xpath('//tr'):
+                cells = [cell.text_content().strip() for cell in tr.xpath('./td|./th')]
+                if cells:
+                    rows.append(cells)
+            return rows
             
         except Exception as e:
             logger.warning(f"HTML table parsing failed: {e}")
@@ -545,31 +1050,42 @@ class InvoiceOCREngine:
         Extract structured invoice data from OCR text and tables
         """
         
+        # Lowercased once so each field can skip its scan when none of its keywords appear
+        lowered = text.lower()
+        
         # Extract fields using regex patterns
-        invoice_number = self._extract_field(text, PATTERNS['invoice_number']) or 'UNKNOWN'
-        invoice_date = self._extract_date(text, PATTERNS['invoice_date']) or date.today()
-        due_date = self._extract_date(text, PATTERNS['due_date'])
+        invoice_number = self._extract_field(text, FIELD_PATTERNS['invoice_number'], lowered) or 'UNKNOWN'
+        invoice_date = self._extract_date(text, FIELD_PATTERNS['invoice_date'], lowered) or date.today()
+        due_date = self._extract_date(text, FIELD_PATTERNS['due_date'], lowered)
         
         # Vendor details
-        vendor_gstin = self._extract_field(text, PATTERNS['gstin'])
-        vendor_pan = self._extract_field(text, PATTERNS['pan'])
+        # Regexes only run when a GSTIN/PAN-shaped token exists somewhere on the page
+        classes = char_classes(text)
+        vendor_gstin = (
+            self._extract_field(text, FIELD_PATTERNS['gstin'], lowered)
+            if has_token_shape(classes, GSTIN_SHAPE) else None
+        )
+        vendor_pan = (
+            self._extract_field(text, FIELD_PATTERNS['pan'], lowered)
+            if has_token_shape(classes, PAN_SHAPE) else None
+        )
         vendor_name = self._extract_vendor_name(text, vendor_gstin)
         
         # Shipment details
-        lr_number = self._extract_field(text, PATTERNS['lr_number'])
-        vehicle_number = self._extract_field(text, PATTERNS['vehicle_number'])
-        weight = self._extract_number(text, PATTERNS['weight'])
-        origin = self._extract_field(text, PATTERNS['origin'])
-        destination = self._extract_field(text, PATTERNS['destination'])
+        lr_number = self._extract_field(text, FIELD_PATTERNS['lr_number'], lowered)
+        vehicle_number = self._extract_field(text, FIELD_PATTERNS['vehicle_number'], lowered)
+        weight = self._extract_number(text, FIELD_PATTERNS['weight'], lowered)
+        origin = self._extract_field(text, FIELD_PATTERNS['origin'], lowered)
+        destination = self._extract_field(text, FIELD_PATTERNS['destination'], lowered)
         
         # Amounts
-        subtotal = self._extract_number(text, PATTERNS['subtotal']) or 0.0
-        total = self._extract_number(text, PATTERNS['total']) or subtotal
+        subtotal = self._extract_number(text, FIELD_PATTERNS['subtotal'], lowered) or 0.0
+        total = self._extract_number(text, FIELD_PATTERNS['total'], lowered) or subtotal
         
         # Tax extraction
-        cgst_match = self._extract_tax(text, PATTERNS['cgst'])
-        sgst_match = self._extract_tax(text, PATTERNS['sgst'])
-        igst_match = self._extract_tax(text, PATTERNS['igst'])
+        cgst_match = self._extract_tax(text, PATTERNS['cgst']) if 'cgst' in lowered else None
+        sgst_match = self._extract_tax(text, PATTERNS['sgst']) if 'sgst' in lowered else None
+        igst_match = self._extract_tax(text, PATTERNS['igst']) if 'igst' in lowered else None
         
         # Build line items from tables
         line_items = self._extract_line_items(tables, text)
@@ -621,49 +1137,39 @@ class InvoiceOCREngine:
             confidence_score=confidence,
             source_file=source_file,
             page_count=page_count,
-            extraction_timestamp=datetime.now(),
         )
     
-    def _extract_field(self, text: str, patterns: List[str]) -> Optional[str]:
-        """Extract field using multiple regex patterns"""
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
-            if match:
-                return match.group(1).strip()
-        return None
+    def _extract_field(self, text: str, patterns: PatternUnion, lowered: Optional[str] = None) -> Optional[str]:
+        """Extract field using its merged alternative patterns"""
+        value = patterns.extract(text, lowered)
+        return value.strip() if value is not None else None
     
-    def _extract_date(self, text: str, patterns: List[str]) -> Optional[date]:
+    def _extract_date(self, text: str, patterns: PatternUnion, lowered: Optional[str] = None) -> Optional[date]:
         """Extract and parse date"""
-        date_str = self._extract_field(text, patterns)
+        date_str = self._extract_field(text, patterns, lowered)
         if date_str:
-            # Try multiple date formats
-            formats = ['%d/%m/%Y', '%d-%m-%Y', '%d.%m.%Y', '%d/%m/%y', '%d-%m-%y']
-            for fmt in formats:
-                try:
-                    return datetime.strptime(date_str, fmt).date()
-                except ValueError:
-                    continue
+            return parse_invoice_date(date_str)
         return None
     
-    def _extract_number(self, text: str, patterns: List[str]) -> Optional[float]:
+    def _extract_number(self, text: str, patterns: PatternUnion, lowered: Optional[str] = None) -> Optional[float]:
         """Extract numeric value"""
-        value_str = self._extract_field(text, patterns)
+        value_str = self._extract_field(text, patterns, lowered)
         if value_str:
             try:
                 # Remove commas and parse
-                return float(value_str.replace(',', ''))
+                return _parse_money(value_str)
             except ValueError:
                 pass
         return None
     
-    def _extract_tax(self, text: str, patterns: List[str]) -> Optional[Tuple[float, float]]:
+    def _extract_tax(self, text: str, patterns: List[Pattern]) -> Optional[Tuple[float, float]]:
         """Extract tax rate and amount"""
         for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+            match = pattern.search(text)
             if match:
                 try:
                     rate = float(match.group(1))
-                    amount = float(match.group(2).replace(',', ''))
+                    amount = _parse_money(match.group(2))
                     return (rate, amount)
                 except (ValueError, IndexError):
                     continue
@@ -696,39 +1202,35 @@ class InvoiceOCREngine:
             # Find header row
             header = [cell.lower() for cell in table[0]]
             
-            # Look for amount/rate columns
-            amount_idx = None
-            desc_idx = None
-            rate_idx = None
-            qty_idx = None
-            
+            # Look for amount/rate columns (first matching role wins per header cell)
+            indices: Dict[str, int] = {}
             for i, h in enumerate(header):
-                if 'amount' in h or 'total' in h:
-                    amount_idx = i
-                elif 'description' in h or 'particular' in h or 'item' in h:
-                    desc_idx = i
-                elif 'rate' in h or 'price' in h:
-                    rate_idx = i
-                elif 'qty' in h or 'quantity' in h:
-                    qty_idx = i
+                for role, keywords in _COL_ROLES:
+                    if any(k in h for k in keywords):
+                        indices[role] = i
+                        break
+            amount_idx = indices.get('amount')
+            desc_idx = indices.get('description')
+            rate_idx = indices.get('rate')
+            qty_idx = indices.get('qty')
             
             # Parse data rows
             for row in table[1:]:
                 try:
                     if amount_idx is not None and amount_idx < len(row):
-                        amount_str = row[amount_idx].replace(',', '').replace('₹', '').strip()
+                        amount_str = _money_str(row[amount_idx])
                         amount = float(amount_str) if amount_str else 0
                         
                         desc = row[desc_idx] if desc_idx is not None and desc_idx < len(row) else 'Freight Charges'
                         
                         rate = 0.0
                         if rate_idx is not None and rate_idx < len(row):
-                            rate_str = row[rate_idx].replace(',', '').strip()
+                            rate_str = _money_str(row[rate_idx])
                             rate = float(rate_str) if rate_str else 0
                         
                         qty = 1.0
                         if qty_idx is not None and qty_idx < len(row):
-                            qty_str = row[qty_idx].replace(',', '').strip()
+                            qty_str = _money_str(row[qty_idx])
                             qty = float(qty_str) if qty_str else 1
                         
                         if amount > 0:
@@ -6,354 +6,539 @@ Handles invoice lifecycle from OCR to payment.
 """
 
 import psycopg2
-from psycopg2 import Error
-from psycopg2.extras import RealDictCursor
-from typing import List, Dict, Optional
+from psycopg2 import Error, pool
+from psycopg2.extras import RealDictCursor, Json, execute_values
+from typing import List, Dict, Optional, Tuple, Iterable, Iterator
 from datetime import datetime
-import json
+from contextlib import contextmanager
+import threading
+import csv
+import io
+import logging
 import os
+import uuid
 
 # Import database config
 from db_config import DATABASE_URL
+from services.db_service import (
+    encode_page_cursor, decode_page_cursor, make_db_op, new_ulid, acquire_pooled
+)
+
+logger = logging.getLogger(__name__)
+
+# Connection pool bounds; each API call borrows a connection instead of a fresh TCP+TLS+auth handshake
+POOL_MIN_CONN = int(os.getenv('DB_POOL_MIN_CONN', 2))
+POOL_MAX_CONN = int(os.getenv('DB_POOL_MAX_CONN', 20))
+
+_pool: Optional[pool.ThreadedConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+# TIMESTAMP columns decoded straight to ISO-8601 strings ('2024-01-02 10:11:12' -> '2024-01-02T10:11:12')
+# during the fetch, instead of building datetimes and walking every row to call isoformat()
+TIMESTAMP_ISO = psycopg2.extensions.new_type(
+    (1114,), 'TIMESTAMP_ISO',
+    lambda value, cursor: value.replace(' ', 'T', 1) if value is not None else None
+)
+
+
+class PreparingConnection(psycopg2.extensions.connection):
+    """
+    Pooled invoice-service connection: remembers which server-side prepared statements
+    it already holds, and returns TIMESTAMP values as ISO strings.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = set()
+        psycopg2.extensions.register_type(TIMESTAMP_ISO, self)
+
+
+def get_pool() -> pool.ThreadedConnectionPool:
+    """Create the shared connection pool on first use (not at import, so the app starts without a DB)"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                if not DATABASE_URL:
+                    raise ValueError("DATABASE_URL is not set in environment or db_config.py")
+                _pool = pool.ThreadedConnectionPool(
+                    POOL_MIN_CONN, POOL_MAX_CONN, DATABASE_URL,
+                    connection_factory=PreparingConnection
+                )
+    return _pool
+
+
+@contextmanager
+def pg_conn():
+    """
+    Borrow a pooled connection; rolled back on error and always returned to the pool.
+    Waits up to POOL_ACQUIRE_TIMEOUT for one to come free, then raises PoolExhaustedError.
+    """
+    conn_pool = get_pool()
+    conn = acquire_pooled(conn_pool.getconn, pool.PoolError)
+    try:
+        yield conn
+    except Exception:
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        conn_pool.putconn(conn)
+
+
+# Columns the invoice list consumers read; skips the heavy OCR text / JSONB payloads
+INVOICE_LIST_COLUMNS = """
+    id, invoice_number, invoice_date, due_date,
+    vendor_id, vendor_name, contract_id,
+    origin, destination, vehicle_number, lr_number,
+    base_amount, total_amount, currency, status,
+    approved_by, approved_at, rejection_reason,
+    invoice_path, lr_path, pod_path,
+    created_at, updated_at
+"""
+
+# Statuses counted as pending in get_invoice_stats
+PENDING_STATUSES = "('PENDING_OCR', 'PENDING_VALIDATION', 'PENDING_APPROVAL')"
+
+# Rows per multi-row INSERT statement for bulk loads
+BULK_PAGE_SIZE = 500
+
+# Rows fetched per round trip by iter_invoices' server-side cursor
+STREAM_BATCH_ROWS = 2000
+
+# Rows buffered as CSV before each COPY chunk is sent
+COPY_CHUNK_ROWS = 10000
+
+INVOICE_INSERT_COLUMNS = """
+    id, invoice_number, invoice_date, due_date,
+    vendor_id, vendor_name, vendor_gstin,
+    contract_id, shipment_id, po_number,
+    origin, destination, vehicle_number, vehicle_type, lr_number,
+    base_amount, fuel_surcharge, accessorial_charges, other_charges,
+    subtotal, cgst_amount, sgst_amount, igst_amount, tds_amount,
+    total_amount, currency, status,
+    ocr_confidence, ocr_raw_text, ocr_processed_at,
+    invoice_path, lr_path, pod_path, supporting_docs, line_items
+"""
+
+
+def _invoice_row(invoice_data: Dict, invoice_id: str) -> tuple:
+    """Parameter tuple for INVOICE_INSERT_COLUMNS, with amount defaults filled in"""
+    # Calculate amounts
+    base_amount = float(invoice_data.get('base_amount', 0) or invoice_data.get('amount', 0))
+    tax_amount = float(invoice_data.get('tax_amount', 0))
+    total_amount = float(invoice_data.get('total_amount', base_amount + tax_amount))
+    
+    return (
+        invoice_id,
+        invoice_data.get('invoice_number'),
+        invoice_data.get('invoice_date'),
+        invoice_data.get('due_date'),
+        invoice_data.get('vendor_id'),
+        invoice_data.get('vendor_name'),
+        invoice_data.get('vendor_gstin'),
+        invoice_data.get('contract_id'),
+        invoice_data.get('shipment_id'),
+        invoice_data.get('po_number'),
+        invoice_data.get('origin'),
+        invoice_data.get('destination'),
+        invoice_data.get('vehicle_number'),
+        invoice_data.get('vehicle_type'),
+        invoice_data.get('lr_number'),
+        base_amount,
+        invoice_data.get('fuel_surcharge', 0),
+        invoice_data.get('accessorial_charges', 0),
+        invoice_data.get('other_charges', 0),
+        invoice_data.get('subtotal', base_amount),
+        invoice_data.get('cgst_amount', 0),
+        invoice_data.get('sgst_amount', 0),
+        invoice_data.get('igst_amount', 0),
+        invoice_data.get('tds_amount', 0),
+        total_amount,
+        invoice_data.get('currency', 'INR'),
+        invoice_data.get('status', 'PENDING_OCR'),
+        invoice_data.get('ocr_confidence'),
+        invoice_data.get('ocr_raw_text'),
+        datetime.now() if invoice_data.get('ocr_raw_text') else None,
+        invoice_data.get('invoice_path'),
+        invoice_data.get('lr_path'),
+        invoice_data.get('pod_path'),
+        Json(invoice_data.get('supporting_docs', {})),
+        Json(invoice_data.get('line_items', []))
+    )
+
+
+def _csv_value(value):
+    """COPY CSV field for a row value: \\N for NULL, JSONB (Json) as plain json text"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, Json):
+        return value.dumps(value.adapted)
+    return value
+
+
+def _copy_rows(cursor, copy_sql: str, rows: Iterable[tuple]) -> int:
+    """Send rows through COPY FROM STDIN as CSV, COPY_CHUNK_ROWS at a time. Returns rows sent."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    sent = 0
+    for row in rows:
+        writer.writerow([_csv_value(value) for value in row])
+        sent += 1
+        if sent % COPY_CHUNK_ROWS == 0:
+            buf.seek(0)
+            cursor.copy_expert(copy_sql, buf)
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        buf.seek(0)
+        cursor.copy_expert(copy_sql, buf)
+    return sent
+
+
+# Session-private, unlogged staging table for OCR bursts; emptied at every commit
+STAGING_INVOICES_SQL = """
+    CREATE TEMP TABLE IF NOT EXISTS staging_invoices
+    (LIKE invoices INCLUDING DEFAULTS) ON COMMIT DELETE ROWS
+"""
+
+
+# Columns update_invoice may change, and the JSONB ones among them (wrapped in Json)
+INVOICE_UPDATE_FIELDS = (
+    'invoice_number', 'invoice_date', 'due_date', 'vendor_id', 'vendor_name',
+    'contract_id', 'origin', 'destination', 'vehicle_number', 'lr_number',
+    'base_amount', 'total_amount', 'status', 'ocr_confidence', 'ocr_raw_text',
+    'sentinel_passed', 'contract_matched', 'contract_rate', 'rate_variance',
+    'approved_by', 'rejection_reason', 'invoice_path', 'lr_path', 'pod_path',
+    'sentinel_results', 'line_items'
+)
+INVOICE_JSON_FIELDS = ('sentinel_results', 'line_items')
+
+
+def _update_invoice_sql() -> str:
+    """
+    One fixed UPDATE covering every updatable column: ($2k+1, $2k+2) is a
+    (present, value) pair per field, so absent fields keep their value and an
+    explicit None still clears the column.
+    """
+    assignments = []
+    for n, field in enumerate(INVOICE_UPDATE_FIELDS):
+        value = f"${2 * n + 2}::jsonb" if field in INVOICE_JSON_FIELDS else f"${2 * n + 2}"
+        assignments.append(f"{field} = CASE WHEN ${2 * n + 1} THEN {value} ELSE {field} END")
+    return (
+        f"UPDATE invoices SET {', '.join(assignments)}, updated_at = NOW() "
+        f"WHERE id = ${2 * len(INVOICE_UPDATE_FIELDS) + 1}"
+    )
+
+
+# Columns handed back by the status updates, so callers needn't re-fetch the invoice
+INVOICE_STATUS_RETURNING = "id, status, approved_by, approved_at, rejection_reason, updated_at"
+
+
+# Hot-path statements, PREPAREd once per physical connection so the server skips parse/plan.
+# (Needs session-level pooling: PgBouncer in transaction mode does not keep prepared statements.)
+PREPARED_STATEMENTS = {
+    'get_invoice_by_id': "SELECT * FROM invoices WHERE id = $1",
+    'create_invoice': (
+        f"INSERT INTO invoices ({INVOICE_INSERT_COLUMNS}) "
+        f"VALUES ({', '.join(f'${n}' for n in range(1, 36))})"
+    ),
+    'set_status_approved': f"""
+        UPDATE invoices 
+        SET status = $1, approved_by = $2, approved_at = NOW(), updated_at = NOW()
+        WHERE id = $3
+        RETURNING {INVOICE_STATUS_RETURNING}
+    """,
+    'set_status_rejected': f"""
+        UPDATE invoices 
+        SET status = $1, rejection_reason = $2, updated_at = NOW()
+        WHERE id = $3
+        RETURNING {INVOICE_STATUS_RETURNING}
+    """,
+    'set_status': f"UPDATE invoices SET status = $1, updated_at = NOW() WHERE id = $2 RETURNING {INVOICE_STATUS_RETURNING}",
+    'save_sentinel_results': """
+        UPDATE invoices 
+        SET sentinel_results = $1, sentinel_passed = $2, sentinel_validated_at = NOW(),
+            status = CASE WHEN $3 THEN 'PENDING_APPROVAL' ELSE 'PENDING_VALIDATION' END,
+            updated_at = NOW()
+        WHERE id = $4
+        RETURNING id, status, sentinel_passed, sentinel_validated_at
+    """,
+    'update_invoice': _update_invoice_sql(),
+}
+
+
+# Run an InvoiceServiceDB method on a pooled connection; see make_db_op
+db_op = make_db_op(pg_conn, Error, logger)
+
+
+def execute_prepared(cursor, name: str, params: tuple):
+    """EXECUTE a statement from PREPARED_STATEMENTS, preparing it on this connection first if needed"""
+    conn = cursor.connection
+    if name not in conn.prepared:
+        cursor.execute(f"PREPARE {name} AS {PREPARED_STATEMENTS[name]}")
+        conn.prepared.add(name)
+    cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
 
-def get_connection():
-    """Get PostgreSQL connection with database"""
-    if not DATABASE_URL:
-        raise ValueError("DATABASE_URL is not set in environment or db_config.py")
-    return psycopg2.connect(DATABASE_URL)
 
 class InvoiceServiceDB:
     """
     Invoice Service with PostgreSQL backend.
     """
     
-    def get_all_invoices(self, 
+    @db_op(default=list, cursor_factory=RealDictCursor)
+    def get_all_invoices(self, cursor,
                          status: Optional[str] = None, 
                          vendor_id: Optional[str] = None,
                          limit: int = 100,
-                         offset: int = 0) -> List[Dict]:
-        """Get all invoices with optional filtering"""
-        try:
-            conn = get_connection()
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            
-            query = "SELECT * FROM invoices WHERE 1=1"
-            params = []
-            
-            if status:
-                query += " AND status = %s"
-                params.append(status)
-            
-            if vendor_id:
-                query += " AND vendor_id = %s"
-                params.append(vendor_id)
-            
-            query += " ORDER BY invoice_date DESC, created_at DESC"
-            query += " LIMIT %s OFFSET %s"
-            params.append(limit)
+                         offset: int = 0,
+                         after: Optional[Tuple[str, str]] = None) -> List[Dict]:
+        """
+        Get all invoices with optional filtering
+        
+        Pass after=(invoice_date, id) of the previous page's last row for keyset
+        pagination (index seek, constant cost at any depth); offset is kept for old clients.
+        """
+        query = f"SELECT {INVOICE_LIST_COLUMNS} FROM invoices WHERE 1=1"
+        params = []
+        
+        if status:
+            query += " AND status = %s"
+            params.append(status)
+        
+        if vendor_id:
+            query += " AND vendor_id = %s"
+            params.append(vendor_id)
+        
+        if after:
+            query += " AND (invoice_date, id) < (%s::date, %s)"
+            params.extend(after)
+        
+        query += " ORDER BY invoice_date DESC, id DESC"
+        query += " LIMIT %s"
+        params.append(limit)
+        if offset and not after:
+            query += " OFFSET %s"
             params.append(offset)
-            
-            cursor.execute(query, tuple(params))
-            invoices = cursor.fetchall()
-            
-            # Post-process JSON fields if they are returned as strings (psycopg2 usually handles jsonb automatically)
-            # But just in case, we check types
-            processed_invoices = []
-            for invoice in invoices:
-                # Convert datetime types for JSON serialization compatibility
-                for key, val in invoice.items():
-                    if isinstance(val, datetime):
-                        invoice[key] = val.isoformat()
-                
-                # Psycopg2 with JSONB automatically returns dicts, no need to json.loads unless it's text
-                processed_invoices.append(invoice)
-            
-            cursor.close()
-            conn.close()
-            
-            return processed_invoices
-            
-        except Error as e:
-            print(f"Error fetching invoices: {e}")
-            return []
+        
+        cursor.execute(query, tuple(params))
+        
+        # Timestamps already arrive as ISO strings (see PreparingConnection)
+        return cursor.fetchall()
     
-    def get_invoice_by_id(self, invoice_id: str) -> Optional[Dict]:
-        """Get a single invoice by ID"""
+    def iter_invoices(self,
+                      status: Optional[str] = None,
+                      vendor_id: Optional[str] = None,
+                      batch: int = STREAM_BATCH_ROWS) -> Iterator[Dict]:
+        """
+        Stream every matching invoice (full rows) for exports / batch jobs
+        
+        Uses a named server-side cursor, so rows arrive `batch` at a time and memory
+        stays flat however large the result is. The pooled connection is held until
+        the generator is exhausted or closed.
+        """
+        query = "SELECT * FROM invoices WHERE 1=1"
+        params = []
+        
+        if status:
+            query += " AND status = %s"
+            params.append(status)
+        
+        if vendor_id:
+            query += " AND vendor_id = %s"
+            params.append(vendor_id)
+        
+        query += " ORDER BY invoice_date DESC, id DESC"
+        
+        # A generator can't go through db_op (it would release the connection on the first row)
         try:
-            conn = get_connection()
-            cursor = conn.cursor(cursor_factory=RealDictCursor)
-            
-            cursor.execute("SELECT * FROM invoices WHERE id = %s", (invoice_id,))
-            invoice = cursor.fetchone()
-            
-            if not invoice:
-                cursor.close()
-                conn.close()
-                return None
-            
-            # Serialize datetimes
-            for key, val in invoice.items():
-                if isinstance(val, datetime):
-                    invoice[key] = val.isoformat()
-            
-            cursor.close()
-            conn.close()
-            
-            return invoice
-            
-        except Error as e:
-            print(f"Error fetching invoice {invoice_id}: {e}")
-            return None
+            with pg_conn() as conn, conn.cursor(f"inv_stream_{uuid.uuid4().hex}", cursor_factory=RealDictCursor) as cursor:
+                cursor.itersize = batch
+                cursor.execute(query, tuple(params))
+                for row in cursor:
+                    yield row
+            
+        except Error:
+            logger.exception("Error streaming invoices")
     
-    def create_invoice(self, invoice_data: Dict) -> Optional[str]:
+    @db_op(default=None, cursor_factory=RealDictCursor)
+    def get_invoice_by_id(self, cursor, invoice_id: str) -> Optional[Dict]:
+        """Get a single invoice by ID"""
+        execute_prepared(cursor, 'get_invoice_by_id', (invoice_id,))
+        
+        # Timestamps already arrive as ISO strings (see PreparingConnection)
+        return cursor.fetchone()
+    
+    @db_op(default=None, commit=True)
+    def create_invoice(self, cursor, invoice_data: Dict) -> Optional[str]:
         """Create a new invoice"""
-        try:
-            conn = get_connection()
-            cursor = conn.cursor()
-            
-            invoice_id = invoice_data.get('id') or f"INV-{datetime.now().strftime('%Y%m%d%H%M%S')}"
-            
-            # Calculate amounts
-            base_amount = float(invoice_data.get('base_amount', 0) or invoice_data.get('amount', 0))
-            tax_amount = float(invoice_data.get('tax_amount', 0))
-            total_amount = float(invoice_data.get('total_amount', base_amount + tax_amount))
-            
-            cursor.execute("""
-                INSERT INTO invoices (
-                    id, invoice_number, invoice_date, due_date,
-                    vendor_id, vendor_name, vendor_gstin,
-                    contract_id, shipment_id, po_number,
-                    origin, destination, vehicle_number, vehicle_type, lr_number,
-                    base_amount, fuel_surcharge, accessorial_charges, other_charges,
-                    subtotal, cgst_amount, sgst_amount, igst_amount, tds_amount,
-                    total_amount, currency, status,
-                    ocr_confidence, ocr_raw_text, ocr_processed_at,
-                    invoice_path, lr_path, pod_path, supporting_docs, line_items
-                ) VALUES (
-                    %s, %s, %s, %s,
-                    %s, %s, %s,
-                    %s, %s, %s,
-                    %s, %s, %s, %s, %s,
-                    %s, %s, %s, %s,
-                    %s, %s, %s, %s, %s,
-                    %s, %s, %s,
-                    %s, %s, %s,
-                    %s, %s, %s, %s, %s
-                )
-            """, (
-                invoice_id,
-                invoice_data.get('invoice_number'),
-                invoice_data.get('invoice_date'),
-                invoice_data.get('due_date'),
-                invoice_data.get('vendor_id'),
-                invoice_data.get('vendor_name'),
-                invoice_data.get('vendor_gstin'),
-                invoice_data.get('contract_id'),
-                invoice_data.get('shipment_id'),
-                invoice_data.get('po_number'),
-                invoice_data.get('origin'),
-                invoice_data.get('destination'),
-                invoice_data.get('vehicle_number'),
-                invoice_data.get('vehicle_type'),
-                invoice_data.get('lr_number'),
-                base_amount,
-                invoice_data.get('fuel_surcharge', 0),
-                invoice_data.get('accessorial_charges', 0),
-                invoice_data.get('other_charges', 0),
-                invoice_data.get('subtotal', base_amount),
-                invoice_data.get('cgst_amount', 0),
-                invoice_data.get('sgst_amount', 0),
-                invoice_data.get('igst_amount', 0),
-                invoice_data.get('tds_amount', 0),
-                total_amount,
-                invoice_data.get('currency', 'INR'),
-                invoice_data.get('status', 'PENDING_OCR'),
-                invoice_data.get('ocr_confidence'),
-                invoice_data.get('ocr_raw_text'),
-                datetime.now() if invoice_data.get('ocr_raw_text') else None,
-                invoice_data.get('invoice_path'),
-                invoice_data.get('lr_path'),
-                invoice_data.get('pod_path'),
-                json.dumps(invoice_data.get('supporting_docs', {})), # JSONB accepts json string
-                json.dumps(invoice_data.get('line_items', []))       # JSONB accepts json string
-            ))
-            
-            conn.commit()
-            cursor.close()
-            conn.close()
-            
-            return invoice_id
-            
-        except Error as e:
-            print(f"Error creating invoice: {e}")
-            return None
+        invoice_id = invoice_data.get('id') or f"INV-{new_ulid()}"
+        
+        execute_prepared(cursor, 'create_invoice', _invoice_row(invoice_data, invoice_id))
+        
+        return invoice_id
+    
+    @db_op(default=list, commit=True)
+    def bulk_create_invoices(self, cursor, items: List[Dict]) -> List[str]:
+        """
+        Create many invoices in one transaction using multi-row INSERTs (execute_values)
+        
+        Rows whose id already exists are skipped. Returns the ids actually inserted.
+        """
+        if not items:
+            return []
+        
+        rows = [
+            _invoice_row(item, item.get('id') or f"INV-{new_ulid()}")
+            for item in items
+        ]
+        inserted = execute_values(
+            cursor,
+            f"INSERT INTO invoices ({INVOICE_INSERT_COLUMNS}) VALUES %s "
+            "ON CONFLICT (id) DO NOTHING RETURNING id",
+            rows,
+            page_size=BULK_PAGE_SIZE,
+            fetch=True
+        )
+        
+        return [row[0] for row in inserted]
+    
+    @db_op(default=0, commit=True)
+    def copy_import_invoices(self, cursor, items: Iterable[Dict]) -> int:
+        """
+        Mass-import invoices through COPY FROM STDIN (far cheaper than INSERTs per row)
+        
+        Rows are serialised to CSV in chunks of COPY_CHUNK_ROWS so the whole import is
+        never held in memory; all chunks load in one transaction. Unlike
+        bulk_create_invoices, an existing id aborts the import. Returns rows copied.
+        """
+        copy_sql = f"COPY invoices ({INVOICE_INSERT_COLUMNS}) FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+        
+        return _copy_rows(cursor, copy_sql, (
+            _invoice_row(item, item.get('id') or f"INV-{new_ulid()}")
+            for item in items
+        ))
+    
+    @db_op(default=list, commit=True)  # commit empties the staging table (ON COMMIT DELETE ROWS)
+    def flush_ocr_batch(self, cursor, items: List[Dict]) -> List[str]:
+        """
+        Load a burst of OCR'd invoices: COPY into staging_invoices, then one
+        INSERT ... SELECT into invoices
+        
+        COPY-speed loading that, unlike copy_import_invoices, skips ids that already
+        exist (e.g. a re-uploaded batch). The staging table is a temp table, so it is
+        unlogged and private to the pooled connection. Returns the ids inserted.
+        """
+        if not items:
+            return []
+        
+        copy_sql = f"COPY staging_invoices ({INVOICE_INSERT_COLUMNS}) FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+        
+        cursor.execute(STAGING_INVOICES_SQL)
+        _copy_rows(cursor, copy_sql, (
+            _invoice_row(item, item.get('id') or f"INV-{new_ulid()}")
+            for item in items
+        ))
+        cursor.execute(f"""
+            INSERT INTO invoices ({INVOICE_INSERT_COLUMNS})
+            SELECT {INVOICE_INSERT_COLUMNS} FROM staging_invoices
+            ON CONFLICT (id) DO NOTHING
+            RETURNING id
+        """)
+        
+        return [row[0] for row in cursor.fetchall()]
     
-    def update_invoice(self, invoice_id: str, updates: Dict) -> bool:
+    @db_op(default=False, commit=True)
+    def update_invoice(self, cursor, invoice_id: str, updates: Dict) -> bool:
         """Update an existing invoice"""
-        try:
-            conn = get_connection()
-            cursor = conn.cursor()
-            
-            fields = []
-            values = []
-            
-            updatable_fields = [
-                'invoice_number', 'invoice_date', 'due_date', 'vendor_id', 'vendor_name',
-                'contract_id', 'origin', 'destination', 'vehicle_number', 'lr_number',
-                'base_amount', 'total_amount', 'status', 'ocr_confidence', 'ocr_raw_text',
-                'sentinel_passed', 'contract_matched', 'contract_rate', 'rate_variance',
-                'approved_by', 'rejection_reason', 'invoice_path', 'lr_path', 'pod_path'
-            ]
-            
-            for field in updatable_fields:
-                if field in updates:
-                    fields.append(f"{field} = %s")
-                    values.append(updates[field])
-            
-            # Handle JSON fields specially
-            if 'sentinel_results' in updates:
-                fields.append("sentinel_results = %s")
-                values.append(json.dumps(updates['sentinel_results']))
-            
-            if 'line_items' in updates:
-                fields.append("line_items = %s")
-                values.append(json.dumps(updates['line_items']))
-            
-            if not fields:
-                return False
-            
-            values.append(invoice_id)
-            query = f"UPDATE invoices SET {', '.join(fields)}, updated_at = NOW() WHERE id = %s"
-            
-            cursor.execute(query, tuple(values))
-            conn.commit()
-            
-            affected = cursor.rowcount
-            cursor.close()
-            conn.close()
-            
-            return affected > 0
-            
-        except Error as e:
-            print(f"Error updating invoice: {e}")
+        if not any(field in updates for field in INVOICE_UPDATE_FIELDS):
             return False
+        
+        # Same statement text whatever subset is updated, so it is prepared once per connection
+        values = []
+        for field in INVOICE_UPDATE_FIELDS:
+            present = field in updates
+            value = updates.get(field)
+            if present and field in INVOICE_JSON_FIELDS:
+                value = Json(value)
+            values.extend((present, value))
+        values.append(invoice_id)
+        
+        execute_prepared(cursor, 'update_invoice', tuple(values))
+        
+        return cursor.rowcount > 0
     
-    def update_invoice_status(self, invoice_id: str, status: str, 
+    @db_op(default=None, commit=True, cursor_factory=RealDictCursor)
+    def update_invoice_status(self, cursor, invoice_id: str, status: str, 
                                approved_by: str = None, 
-                               rejection_reason: str = None) -> bool:
-        """Update invoice status (approve/reject workflow)"""
-        try:
-            conn = get_connection()
-            cursor = conn.cursor()
-            
-            if status == 'APPROVED':
-                cursor.execute("""
-                    UPDATE invoices 
-                    SET status = %s, approved_by = %s, approved_at = NOW(), updated_at = NOW()
-                    WHERE id = %s
-                """, (status, approved_by, invoice_id))
-            elif status == 'REJECTED':
-                cursor.execute("""
-                    UPDATE invoices 
-                    SET status = %s, rejection_reason = %s, updated_at = NOW()
-                    WHERE id = %s
-                """, (status, rejection_reason, invoice_id))
-            else:
-                cursor.execute("""
-                    UPDATE invoices SET status = %s, updated_at = NOW() WHERE id = %s
-                """, (status, invoice_id))
-            
-            conn.commit()
-            affected = cursor.rowcount
-            cursor.close()
-            conn.close()
-            
-            return affected > 0
-            
-        except Error as e:
-            print(f"Error updating invoice status: {e}")
-            return False
+                               rejection_reason: str = None) -> Optional[Dict]:
+        """
+        Update invoice status (approve/reject workflow)
+        
+        Returns the updated status fields (INVOICE_STATUS_RETURNING), or None if
+        no such invoice exists.
+        """
+        if status == 'APPROVED':
+            execute_prepared(cursor, 'set_status_approved', (status, approved_by, invoice_id))
+        elif status == 'REJECTED':
+            execute_prepared(cursor, 'set_status_rejected', (status, rejection_reason, invoice_id))
+        else:
+            execute_prepared(cursor, 'set_status', (status, invoice_id))
+        
+        return cursor.fetchone()
     
-    def save_sentinel_results(self, invoice_id: str, results: Dict, passed: bool) -> bool:
-        """Save Atlas Sentinel validation results"""
-        try:
-            conn = get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                UPDATE invoices 
-                SET sentinel_results = %s, sentinel_passed = %s, sentinel_validated_at = NOW(),
-                    status = CASE WHEN %s THEN 'PENDING_APPROVAL' ELSE 'PENDING_VALIDATION' END,
-                    updated_at = NOW()
-                WHERE id = %s
-            """, (json.dumps(results), passed, passed, invoice_id))
-            
-            conn.commit()
-            affected = cursor.rowcount
-            cursor.close()
-            conn.close()
-            
-            return affected > 0
-            
-        except Error as e:
-            print(f"Error saving sentinel results: {e}")
-            return False
+    @db_op(default=None, commit=True, cursor_factory=RealDictCursor)
+    def save_sentinel_results(self, cursor, invoice_id: str, results: Dict, passed: bool) -> Optional[Dict]:
+        """
+        Save Atlas Sentinel validation results
+        
+        Returns the invoice's new id/status/sentinel_passed/sentinel_validated_at in
+        the same round trip, or None if no such invoice exists.
+        """
+        execute_prepared(
+            cursor, 'save_sentinel_results', (Json(results), passed, passed, invoice_id)
+        )
+        
+        return cursor.fetchone()
     
-    def get_invoice_stats(self, vendor_id: str = None) -> Dict:
+    @db_op(default=dict)
+    def get_invoice_stats(self, cursor, vendor_id: str = None) -> Dict:
         """Get invoice statistics"""
-        try:
-            conn = get_connection()
-            cursor = conn.cursor()
-            
-            stats = {}
-            where_clause = ""
-            params = []
-            
-            if vendor_id:
-                where_clause = "WHERE vendor_id = %s"
-                params = [vendor_id]
-            
-            # Count by status
-            cursor.execute(f"""
-                SELECT status, COUNT(*) as count, SUM(total_amount) as total
-                FROM invoices {where_clause}
-                GROUP BY status
-            """, tuple(params))
-            
-            stats['by_status'] = {}
-            for row in cursor.fetchall():
-                # row is tuple because we used standard cursor here
-                status_key = row[0] if row[0] else 'UNKNOWN'
+        stats = {}
+        where_clause = ""
+        params = []
+        
+        if vendor_id:
+            where_clause = "WHERE vendor_id = %s"
+            params = [vendor_id]
+        
+        # One scan: per-status groups plus the grand total (GROUPING(status) = 1)
+        cursor.execute(f"""
+            SELECT status, GROUPING(status) AS is_total,
+                   COUNT(*) AS count, SUM(total_amount) AS total,
+                   COUNT(*) FILTER (WHERE status IN {PENDING_STATUSES}) AS pending_count,
+                   SUM(total_amount) FILTER (WHERE status IN {PENDING_STATUSES}) AS pending_total
+            FROM invoices {where_clause}
+            GROUP BY GROUPING SETS ((status), ())
+        """, tuple(params))
+        
+        # The () grouping set always yields the grand-total row, even with no invoices
+        stats['by_status'] = {}
+        for status, is_total, count, total, pending_count, pending_total in cursor.fetchall():
+            if is_total:
+                stats['total_count'] = count
+                stats['total_amount'] = float(total) if total else 0
+                stats['pending_count'] = pending_count
+                stats['pending_amount'] = float(pending_total) if pending_total else 0
+            else:
+                status_key = status if status else 'UNKNOWN'
                 stats['by_status'][status_key] = {
-                    'count': row[1],
-                    'total': float(row[2]) if row[2] else 0
+                    'count': count,
+                    'total': float(total) if total else 0
                 }
-            
-            # Total counts
-            cursor.execute(f"SELECT COUNT(*), SUM(total_amount) FROM invoices {where_clause}", tuple(params))
-            row = cursor.fetchone()
-            stats['total_count'] = row[0]
-            stats['total_amount'] = float(row[1]) if row[1] else 0
-            
-            # Pending amount
-            cursor.execute(f"""
-                SELECT COUNT(*), SUM(total_amount) 
-                FROM invoices 
-                {where_clause + ' AND' if where_clause else 'WHERE'} 
-                status IN ('PENDING_OCR', 'PENDING_VALIDATION', 'PENDING_APPROVAL')
-            """, tuple(params))
-            row = cursor.fetchone()
-            stats['pending_count'] = row[0]
-            stats['pending_amount'] = float(row[1]) if row[1] else 0
-            
-            cursor.close()
-            conn.close()
-            
-            return stats
-            
-        except Error as e:
-            print(f"Error getting invoice stats: {e}")
-            return {}
+        
+        return stats
 
 
 # Singleton instance
@@ -364,13 +549,23 @@ invoice_service_db = InvoiceServiceDB()
 # API ENDPOINT FUNCTIONS
 # ===================================
 
-def api_get_invoices(status: str = None, vendor_id: str = None, limit: int = 100, offset: int = 0) -> Dict:
-    """API: Get all invoices"""
-    invoices = invoice_service_db.get_all_invoices(status, vendor_id, limit, offset)
+def api_get_invoices(status: str = None, vendor_id: str = None, limit: int = 100, offset: int = 0,
+                     cursor: str = None) -> Dict:
+    """API: Get all invoices; pass the previous response's next_cursor to fetch the next page"""
+    try:
+        after = tuple(decode_page_cursor(cursor)) if cursor else None
+    except ValueError as e:
+        return {'success': False, 'error': str(e)}
+    if after is not None and len(after) != 2:
+        return {'success': False, 'error': 'Invalid page cursor'}
+    
+    invoices = invoice_service_db.get_all_invoices(status, vendor_id, limit, offset, after)
+    last = invoices[-1] if limit and len(invoices) == limit else None
     return {
         'success': True,
         'data': invoices,
-        'count': len(invoices)
+        'count': len(invoices),
+        'next_cursor': encode_page_cursor((last['invoice_date'], last['id'])) if last else None
     }
 
 
@@ -399,15 +594,17 @@ def api_update_invoice(invoice_id: str, updates: Dict) -> Dict:
 
 def api_approve_invoice(invoice_id: str, approved_by: str) -> Dict:
     """API: Approve invoice"""
-    if invoice_service_db.update_invoice_status(invoice_id, 'APPROVED', approved_by=approved_by):
-        return {'success': True, 'message': 'Invoice approved'}
+    updated = invoice_service_db.update_invoice_status(invoice_id, 'APPROVED', approved_by=approved_by)
+    if updated:
+        return {'success': True, 'message': 'Invoice approved', 'data': updated}
     return {'success': False, 'error': 'Failed to approve invoice'}
 
 
 def api_reject_invoice(invoice_id: str, reason: str) -> Dict:
     """API: Reject invoice"""
-    if invoice_service_db.update_invoice_status(invoice_id, 'REJECTED', rejection_reason=reason):
-        return {'success': True, 'message': 'Invoice rejected'}
+    updated = invoice_service_db.update_invoice_status(invoice_id, 'REJECTED', rejection_reason=reason)
+    if updated:
+        return {'success': True, 'message': 'Invoice rejected', 'data': updated}
     return {'success': False, 'error': 'Failed to reject invoice'}
 
 
@@ -4,10 +4,21 @@ Location Service - MySQL Integration
 CRUD operations for locations from MySQL database.
 """
 
-import mysql.connector
-from mysql.connector import Error
-from typing import List, Dict, Optional
-from datetime import datetime
+from mysql.connector import Error, PoolError, pooling
+from typing import List, Dict, Optional, Tuple
+from contextlib import contextmanager
+import logging
+import threading
+import os
+import re
+
+from cachetools import TTLCache
+
+from services.db_service import (
+    encode_page_cursor, decode_page_cursor, make_db_op, new_ulid, acquire_pooled
+)
+
+logger = logging.getLogger(__name__)
 
 # Import database config
 try:
@@ -22,19 +33,131 @@ except ImportError:
     DB_NAME = 'ledgerone'
 
 
+# Pooled connections; close() on a pooled connection hands it back instead of disconnecting
+POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 20))
+
+_pool: Optional[pooling.MySQLConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
 def get_connection():
-    """Get MySQL connection with database"""
-    config = DB_CONFIG.copy()
-    config['database'] = DB_NAME
-    return mysql.connector.connect(**config)
+    """
+    Get a MySQL connection with database from the shared pool (created on first use);
+    waits up to POOL_ACQUIRE_TIMEOUT for one to come free, then raises PoolExhaustedError
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                config = DB_CONFIG.copy()
+                config['database'] = DB_NAME
+                _pool = pooling.MySQLConnectionPool(
+                    pool_name='location_service',
+                    pool_size=POOL_SIZE,
+                    **config
+                )
+    return acquire_pooled(_pool.get_connection, PoolError)
+
+
+@contextmanager
+def mysql_conn():
+    """Borrow a pooled connection; rolled back on error and always handed back to the pool"""
+    conn = get_connection()
+    try:
+        yield conn
+    except Exception:
+        if conn.is_connected():
+            conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+# Run a LocationServiceDB method on a pooled connection; see make_db_op
+db_op = make_db_op(mysql_conn, Error, logger)
+
+
+# Locations are near-static reference data read on every validation / milk-run pass:
+# serve repeat reads from memory, dropped on any write through this service
+LOCATION_CACHE_TTL = int(os.getenv('LOCATION_CACHE_TTL', 300))
+LOCATION_SUMMARY_CACHE_TTL = int(os.getenv('LOCATION_SUMMARY_CACHE_TTL', 60))
+
+_location_cache = TTLCache(maxsize=5000, ttl=LOCATION_CACHE_TTL)
+_summary_cache = TTLCache(maxsize=8, ttl=LOCATION_SUMMARY_CACHE_TTL)
+_cache_lock = threading.Lock()  # cachetools caches are not thread-safe
+
+
+def _cache_get(cache: TTLCache, key):
+    with _cache_lock:
+        return cache.get(key)
+
+
+def _cache_put(cache: TTLCache, key, value):
+    with _cache_lock:
+        cache[key] = value
+
+
+def invalidate_location_cache(location_id: Optional[str] = None):
+    """Forget cached reads after a write; location_id=None drops every cached location"""
+    with _cache_lock:
+        _summary_cache.clear()
+        if location_id is None:
+            _location_cache.clear()
+        else:
+            _location_cache.pop(location_id, None)
 
 
-def dict_from_row(cursor, row) -> Dict:
-    """Convert a database row to a dictionary"""
-    if row is None:
-        return None
-    columns = [desc[0] for desc in cursor.description]
-    return dict(zip(columns, row))
+# Rows per multi-row INSERT statement for bulk loads
+BULK_PAGE_SIZE = 500
+
+LOCATION_INSERT_SQL = """
+    INSERT INTO locations (
+        id, code, name, type, address, city, state, pincode,
+        country, latitude, longitude, gstin, contact_name, contact_phone,
+        operating_hours, is_active
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+
+# InnoDB's default innodb_ft_min_token_size; shorter words are not in the FULLTEXT index
+FULLTEXT_MIN_TOKEN = 3
+
+
+def _city_search_clause(city: str) -> Tuple[str, str]:
+    """
+    WHERE fragment and parameter for the city filter.
+    
+    Uses the ft_city FULLTEXT index as a word-prefix search ("navi mum" -> +navi* +mum*);
+    falls back to a LIKE scan when a word is too short to be indexed. Word-prefix matching
+    is narrower than the substring LIKE it replaced: "hyd" finds Hyderabad, "bad" does not.
+    Existing databases need ft_city from schema_location_indexes.sql.
+    """
+    words = re.findall(r"\w+", city)
+    if words and all(len(word) >= FULLTEXT_MIN_TOKEN for word in words):
+        return " AND MATCH(city) AGAINST (%s IN BOOLEAN MODE)", " ".join(f"+{word}*" for word in words)
+    return " AND city LIKE %s", f"%{city}%"
+
+
+def _location_row(location_data: Dict, location_id: str) -> tuple:
+    """Parameter tuple for LOCATION_INSERT_SQL"""
+    return (
+        location_id,
+        location_data.get('code'),
+        location_data.get('name'),
+        location_data.get('type', 'WAREHOUSE'),
+        location_data.get('address'),
+        location_data.get('city'),
+        location_data.get('state'),
+        location_data.get('pincode'),
+        location_data.get('country', 'India'),
+        location_data.get('latitude'),
+        location_data.get('longitude'),
+        location_data.get('gstin'),
+        location_data.get('contact_name'),
+        location_data.get('contact_phone'),
+        location_data.get('operating_hours'),
+        location_data.get('is_active', True)
+    )
 
 
 class LocationServiceDB:
@@ -42,203 +165,182 @@ class LocationServiceDB:
     Location Service with MySQL backend.
     """
     
-    def get_all_locations(self, location_type: Optional[str] = None, city: Optional[str] = None) -> List[Dict]:
-        """Get all locations with optional filtering"""
-        try:
-            conn = get_connection()
-            cursor = conn.cursor()
-            
-            query = "SELECT * FROM locations WHERE is_active = TRUE"
-            params = []
-            
-            if location_type:
-                query += " AND type = %s"
-                params.append(location_type)
-            
-            if city:
-                query += " AND city LIKE %s"
-                params.append(f"%{city}%")
-            
-            query += " ORDER BY city, name ASC"
-            
-            cursor.execute(query, params)
-            rows = cursor.fetchall()
-            
-            locations = []
-            for row in rows:
-                location = dict_from_row(cursor, row)
-                for field in ['created_at', 'updated_at']:
-                    if location.get(field):
-                        location[field] = str(location[field])
-                locations.append(location)
-            
-            cursor.close()
-            conn.close()
-            
-            return locations
-            
-        except Error as e:
-            print(f"Error fetching locations: {e}")
-            return []
+    @db_op(default=list, dictionary=True)
+    def get_all_locations(self, cursor, location_type: Optional[str] = None, city: Optional[str] = None,
+                          limit: Optional[int] = None,
+                          after: Optional[Tuple[str, str, str]] = None) -> List[Dict]:
+        """
+        Get all locations with optional filtering
+        
+        Unpaged by default. With limit, pass after=(city, name, id) of the previous
+        page's last row for keyset pagination.
+        """
+        query = "SELECT * FROM locations WHERE is_active = TRUE"
+        params = []
+        
+        if location_type:
+            query += " AND type = %s"
+            params.append(location_type)
+        
+        if city:
+            clause, param = _city_search_clause(city)
+            query += clause
+            params.append(param)
+        
+        if after:
+            query += " AND (city, name, id) > (%s, %s, %s)"
+            params.extend(after)
+        
+        query += " ORDER BY city, name, id ASC"
+        if limit:
+            query += " LIMIT %s"
+            params.append(limit)
+        
+        cursor.execute(query, params)
+        locations = cursor.fetchall()
+        
+        for location in locations:
+            for field in ['created_at', 'updated_at']:
+                if location.get(field):
+                    location[field] = str(location[field])
+        
+        return locations
     
     def get_location_by_id(self, location_id: str) -> Optional[Dict]:
-        """Get a single location by ID"""
-        try:
-            conn = get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("SELECT * FROM locations WHERE id = %s", (location_id,))
-            row = cursor.fetchone()
-            
-            if not row:
-                cursor.close()
-                conn.close()
+        """Get a single location by ID (cached for LOCATION_CACHE_TTL seconds)"""
+        cached = _cache_get(_location_cache, location_id)
+        if cached is None:
+            cached = self._fetch_location(location_id)
+            if cached is None:
                 return None
-            
-            location = dict_from_row(cursor, row)
-            
-            cursor.close()
-            conn.close()
-            
-            return location
-            
-        except Error as e:
-            print(f"Error fetching location {location_id}: {e}")
-            return None
+            _cache_put(_location_cache, location_id, cached)
+        return dict(cached)
+    
+    @db_op(default=None, dictionary=True)
+    def _fetch_location(self, cursor, location_id: str) -> Optional[Dict]:
+        cursor.execute("SELECT * FROM locations WHERE id = %s", (location_id,))
+        return cursor.fetchone()
     
     def create_location(self, location_data: Dict) -> Optional[str]:
         """Create a new location"""
-        try:
-            conn = get_connection()
-            cursor = conn.cursor()
-            
-            location_id = location_data.get('id') or f"LOC-{datetime.now().strftime('%Y%m%d%H%M%S')}"
-            
-            cursor.execute("""
-                INSERT INTO locations (
-                    id, code, name, type, address, city, state, pincode,
-                    country, latitude, longitude, gstin, contact_name, contact_phone,
-                    operating_hours, is_active
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """, (
-                location_id,
-                location_data.get('code'),
-                location_data.get('name'),
-                location_data.get('type', 'WAREHOUSE'),
-                location_data.get('address'),
-                location_data.get('city'),
-                location_data.get('state'),
-                location_data.get('pincode'),
-                location_data.get('country', 'India'),
-                location_data.get('latitude'),
-                location_data.get('longitude'),
-                location_data.get('gstin'),
-                location_data.get('contact_name'),
-                location_data.get('contact_phone'),
-                location_data.get('operating_hours'),
-                location_data.get('is_active', True)
-            ))
-            
-            conn.commit()
-            cursor.close()
-            conn.close()
-            
-            return location_id
-            
-        except Error as e:
-            print(f"Error creating location: {e}")
-            return None
+        location_id = self._insert_location(location_data)
+        if location_id:
+            invalidate_location_cache(location_id)
+        return location_id
+    
+    @db_op(default=None, commit=True)
+    def _insert_location(self, cursor, location_data: Dict) -> str:
+        location_id = location_data.get('id') or f"LOC-{new_ulid()}"
+        cursor.execute(LOCATION_INSERT_SQL, _location_row(location_data, location_id))
+        return location_id
+    
+    def bulk_create_locations(self, items: List[Dict]) -> int:
+        """
+        Create many locations in one transaction
+        
+        executemany() on a plain INSERT is rewritten by mysql.connector into a single
+        multi-row INSERT. Rows whose id/code already exists are left untouched.
+        Returns the number of rows inserted.
+        """
+        if not items:
+            return 0
+        inserted = self._insert_locations(items)
+        invalidate_location_cache()
+        return inserted
+    
+    @db_op(default=0, commit=True)
+    def _insert_locations(self, cursor, items: List[Dict]) -> int:
+        rows = [
+            _location_row(item, item.get('id') or f"LOC-{new_ulid()}")
+            for item in items
+        ]
+        inserted = 0
+        for i in range(0, len(rows), BULK_PAGE_SIZE):
+            cursor.executemany(
+                LOCATION_INSERT_SQL + " ON DUPLICATE KEY UPDATE id = id",
+                rows[i:i + BULK_PAGE_SIZE]
+            )
+            inserted += cursor.rowcount
+        return inserted
     
     def update_location(self, location_id: str, updates: Dict) -> bool:
         """Update an existing location"""
-        try:
-            conn = get_connection()
-            cursor = conn.cursor()
-            
-            fields = []
-            values = []
-            
-            updatable_fields = [
-                'code', 'name', 'type', 'address', 'city', 'state', 'pincode',
-                'country', 'latitude', 'longitude', 'gstin', 'contact_name',
-                'contact_phone', 'operating_hours', 'is_active'
-            ]
-            
-            for field in updatable_fields:
-                if field in updates:
-                    fields.append(f"{field} = %s")
-                    values.append(updates[field])
-            
-            if not fields:
-                return False
-            
-            values.append(location_id)
-            query = f"UPDATE locations SET {', '.join(fields)} WHERE id = %s"
-            
-            cursor.execute(query, values)
-            conn.commit()
-            
-            affected = cursor.rowcount
-            cursor.close()
-            conn.close()
-            
-            return affected > 0
-            
-        except Error as e:
-            print(f"Error updating location: {e}")
+        fields = []
+        values = []
+        
+        updatable_fields = [
+            'code', 'name', 'type', 'address', 'city', 'state', 'pincode',
+            'country', 'latitude', 'longitude', 'gstin', 'contact_name',
+            'contact_phone', 'operating_hours', 'is_active'
+        ]
+        
+        for field in updatable_fields:
+            if field in updates:
+                fields.append(f"{field} = %s")
+                values.append(updates[field])
+        
+        if not fields:
             return False
+        
+        values.append(location_id)
+        query = f"UPDATE locations SET {', '.join(fields)} WHERE id = %s"
+        
+        updated = self._execute_update(query, values)
+        invalidate_location_cache(location_id)
+        return updated
+    
+    @db_op(default=False, commit=True)
+    def _execute_update(self, cursor, query: str, values: List) -> bool:
+        cursor.execute(query, values)
+        return cursor.rowcount > 0
     
     def get_cities(self) -> List[str]:
-        """Get all unique cities"""
-        try:
-            conn = get_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("SELECT DISTINCT city FROM locations WHERE is_active = TRUE ORDER BY city")
-            cities = [row[0] for row in cursor.fetchall()]
-            
-            cursor.close()
-            conn.close()
-            
-            return cities
-            
-        except Error as e:
-            print(f"Error fetching cities: {e}")
-            return []
+        """Get all unique cities (cached for LOCATION_SUMMARY_CACHE_TTL seconds)"""
+        cached = _cache_get(_summary_cache, 'cities')
+        if cached is None:
+            cached = self._fetch_cities()
+            if cached is None:
+                return []
+            _cache_put(_summary_cache, 'cities', cached)
+        return list(cached)
+    
+    @db_op(default=None)
+    def _fetch_cities(self, cursor) -> List[str]:
+        cursor.execute("SELECT DISTINCT city FROM locations WHERE is_active = TRUE ORDER BY city")
+        return [row[0] for row in cursor.fetchall()]
     
     def get_location_stats(self) -> Dict:
-        """Get location statistics"""
-        try:
-            conn = get_connection()
-            cursor = conn.cursor()
-            
-            stats = {}
-            
-            cursor.execute("SELECT COUNT(*) FROM locations WHERE is_active = TRUE")
-            stats['total'] = cursor.fetchone()[0]
-            
-            cursor.execute("""
-                SELECT type, COUNT(*) as count 
-                FROM locations WHERE is_active = TRUE 
-                GROUP BY type
-            """)
-            stats['by_type'] = {row[0]: row[1] for row in cursor.fetchall()}
-            
-            cursor.execute("""
-                SELECT state, COUNT(*) as count 
-                FROM locations WHERE is_active = TRUE 
-                GROUP BY state ORDER BY count DESC LIMIT 10
-            """)
-            stats['by_state'] = {row[0]: row[1] for row in cursor.fetchall()}
-            
-            cursor.close()
-            conn.close()
-            
-            return stats
-            
-        except Error as e:
-            print(f"Error getting location stats: {e}")
-            return {}
+        """Get location statistics (cached for LOCATION_SUMMARY_CACHE_TTL seconds)"""
+        cached = _cache_get(_summary_cache, 'stats')
+        if cached is None:
+            cached = self._fetch_location_stats()
+            if cached is None:
+                return {}
+            _cache_put(_summary_cache, 'stats', cached)
+        return dict(cached)
+    
+    @db_op(default=None)
+    def _fetch_location_stats(self, cursor) -> Dict:
+        stats = {}
+        
+        cursor.execute("SELECT COUNT(*) FROM locations WHERE is_active = TRUE")
+        stats['total'] = cursor.fetchone()[0]
+        
+        cursor.execute("""
+            SELECT type, COUNT(*) as count 
+            FROM locations WHERE is_active = TRUE 
+            GROUP BY type
+        """)
+        stats['by_type'] = {row[0]: row[1] for row in cursor.fetchall()}
+        
+        cursor.execute("""
+            SELECT state, COUNT(*) as count 
+            FROM locations WHERE is_active = TRUE 
+            GROUP BY state ORDER BY count DESC LIMIT 10
+        """)
+        stats['by_state'] = {row[0]: row[1] for row in cursor.fetchall()}
+        
+        return stats
 
 
 # Singleton instance
@@ -249,13 +351,26 @@ location_service_db = LocationServiceDB()
 # API ENDPOINT FUNCTIONS
 # ===================================
 
-def api_get_locations(location_type: str = None, city: str = None) -> Dict:
-    """API: Get all locations"""
-    locations = location_service_db.get_all_locations(location_type, city)
+def api_get_locations(location_type: str = None, city: str = None, limit: int = None,
+                      cursor: str = None) -> Dict:
+    """
+    API: Get all locations; with limit, pass the previous response's next_cursor for the next page.
+    city matches the start of words in the city name ("navi mum" finds Navi Mumbai), not any substring.
+    """
+    try:
+        after = tuple(decode_page_cursor(cursor)) if cursor else None
+    except ValueError as e:
+        return {'success': False, 'error': str(e)}
+    if after is not None and len(after) != 3:
+        return {'success': False, 'error': 'Invalid page cursor'}
+    
+    locations = location_service_db.get_all_locations(location_type, city, limit, after)
+    last = locations[-1] if limit and len(locations) == limit else None
     return {
         'success': True,
         'data': locations,
-        'count': len(locations)
+        'count': len(locations),
+        'next_cursor': encode_page_cursor((last['city'], last['name'], last['id'])) if last else None
     }
 
 
@@ -12,12 +12,39 @@ Algorithm:
 3. For each cluster, check if Total Weight < Truck Capacity
 4. Calculate cost savings from consolidation
 5. Suggest optimal "Milk Run" routes
+
+Performance notes:
+- The numeric paths (haversine, K-Means assignment, leg matrices) are
+  compute-bound: a handful of transcendentals per pair. They run as NumPy
+  array expressions over CITY_LAT / CITY_LON, and as Numba kernels when numba
+  is installed. Scalar `math` (haversine_distance) stays the cheaper choice
+  for a single pair; NumPy only wins once there are whole arrays to process.
+- The result assembly in optimize_milk_runs is memory-bound (dict allocation,
+  string hashing), so it is kept to one pass per cluster rather than
+  vectorised.
+- Rough sizing: N < 10^2 orders is dominated by interpreter overhead either
+  way; 10^2..10^5 is where the vectorised/JIT paths pay off; beyond 10^5
+  cluster in chunks rather than materialising full (N, k) matrices.
+  GPU offload is not worth it at any size this service sees.
 """
 
+import copy
 import math
+from bisect import bisect_left
 from datetime import datetime, date
+from operator import itemgetter
 from typing import Dict, List, Optional, Tuple
 import random
+import sys
+from types import MappingProxyType
+
+import numpy as np
+
+try:
+    from numba import njit, prange, vectorize
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
 
 # =============================================================================
 # GEOGRAPHIC DATA - INDIAN CITIES WITH COORDINATES
@@ -68,6 +95,17 @@ CITY_COORDINATES = {
     "Indore": (22.7196, 75.8577),
 }
 
+# Struct-of-arrays view of CITY_COORDINATES: city -> index, plus contiguous lat / lon arrays.
+# Names are interned so lookups with the sample orders' (also interned) names hit on identity.
+CITY_INDEX = {sys.intern(city): i for i, city in enumerate(CITY_COORDINATES)}
+CITY_LAT = np.array([lat for lat, _ in CITY_COORDINATES.values()], dtype=np.float64)
+CITY_LON = np.array([lon for _, lon in CITY_COORDINATES.values()], dtype=np.float64)
+
+
+def city_idx(name: str) -> int:
+    """Index of a city in CITY_LAT / CITY_LON, or -1 for cities without coordinates."""
+    return CITY_INDEX.get(name, -1)
+
 # =============================================================================
 # TRUCK CONFIGURATIONS
 # =============================================================================
@@ -110,111 +148,126 @@ TRUCK_TYPES = {
     }
 }
 
+# Struct-of-arrays view of TRUCK_TYPES, smallest capacity first, for vectorised scoring
+TRUCK_IDS = sorted(TRUCK_TYPES, key=lambda truck_id: TRUCK_TYPES[truck_id]["capacity_kg"])
+TRUCK_CAP = np.array([TRUCK_TYPES[t]["capacity_kg"] for t in TRUCK_IDS], dtype=np.float64)
+TRUCK_CPKM = np.array([TRUCK_TYPES[t]["cost_per_km"] for t in TRUCK_IDS], dtype=np.float64)
+TRUCK_FIXED = np.array([TRUCK_TYPES[t]["fixed_cost"] for t in TRUCK_IDS], dtype=np.float64)
+_TRUCK_CAPS = TRUCK_CAP.tolist()  # plain-list copy for scalar bisect lookups
+
 # =============================================================================
 # SAMPLE PENDING ORDERS
 # =============================================================================
 
+# Built once at import and read-only; get_sample_pending_orders hands out copies
+_SAMPLE_PENDING_ORDERS = tuple(MappingProxyType({
+    **order,
+    "origin": sys.intern(order["origin"]),
+    "destination": sys.intern(order["destination"]),
+}) for order in [
+    # Cluster 1: Mumbai region
+    {
+        "order_id": "ORD-2024-001",
+        "origin": "Mumbai",
+        "destination": "Pune",
+        "weight_kg": 800,
+        "value_inr": 45000,
+        "pickup_date": "2024-12-30",
+        "status": "PENDING"
+    },
+    {
+        "order_id": "ORD-2024-002",
+        "origin": "Mumbai",
+        "destination": "Nashik",
+        "weight_kg": 1200,
+        "value_inr": 65000,
+        "pickup_date": "2024-12-30",
+        "status": "PENDING"
+    },
+    {
+        "order_id": "ORD-2024-003",
+        "origin": "Mumbai",
+        "destination": "Thane",
+        "weight_kg": 500,
+        "value_inr": 28000,
+        "pickup_date": "2024-12-30",
+        "status": "PENDING"
+    },
+    
+    # Cluster 2: Delhi NCR
+    {
+        "order_id": "ORD-2024-004",
+        "origin": "Delhi",
+        "destination": "Gurgaon",
+        "weight_kg": 2000,
+        "value_inr": 95000,
+        "pickup_date": "2024-12-30",
+        "status": "PENDING"
+    },
+    {
+        "order_id": "ORD-2024-005",
+        "origin": "Delhi",
+        "destination": "Noida",
+        "weight_kg": 1500,
+        "value_inr": 72000,
+        "pickup_date": "2024-12-30",
+        "status": "PENDING"
+    },
+    {
+        "order_id": "ORD-2024-006",
+        "origin": "Delhi",
+        "destination": "Faridabad",
+        "weight_kg": 900,
+        "value_inr": 42000,
+        "pickup_date": "2024-12-30",
+        "status": "PENDING"
+    },
+    
+    # Cluster 3: South India
+    {
+        "order_id": "ORD-2024-007",
+        "origin": "Bangalore",
+        "destination": "Mysore",
+        "weight_kg": 3000,
+        "value_inr": 125000,
+        "pickup_date": "2024-12-30",
+        "status": "PENDING"
+    },
+    {
+        "order_id": "ORD-2024-008",
+        "origin": "Bangalore",
+        "destination": "Chennai",
+        "weight_kg": 2500,
+        "value_inr": 110000,
+        "pickup_date": "2024-12-30",
+        "status": "PENDING"
+    },
+    
+    # Standalone orders
+    {
+        "order_id": "ORD-2024-009",
+        "origin": "Ahmedabad",
+        "destination": "Surat",
+        "weight_kg": 4500,
+        "value_inr": 180000,
+        "pickup_date": "2024-12-30",
+        "status": "PENDING"
+    },
+    {
+        "order_id": "ORD-2024-010",
+        "origin": "Hyderabad",
+        "destination": "Bangalore",
+        "weight_kg": 6000,
+        "value_inr": 250000,
+        "pickup_date": "2024-12-30",
+        "status": "PENDING"
+    },
+])
+
+
 def get_sample_pending_orders() -> List[Dict]:
-    """Generate sample pending orders for demonstration."""
-    return [
-        # Cluster 1: Mumbai region
-        {
-            "order_id": "ORD-2024-001",
-            "origin": "Mumbai",
-            "destination": "Pune",
-            "weight_kg": 800,
-            "value_inr": 45000,
-            "pickup_date": "2024-12-30",
-            "status": "PENDING"
-        },
-        {
-            "order_id": "ORD-2024-002",
-            "origin": "Mumbai",
-            "destination": "Nashik",
-            "weight_kg": 1200,
-            "value_inr": 65000,
-            "pickup_date": "2024-12-30",
-            "status": "PENDING"
-        },
-        {
-            "order_id": "ORD-2024-003",
-            "origin": "Mumbai",
-            "destination": "Thane",
-            "weight_kg": 500,
-            "value_inr": 28000,
-            "pickup_date": "2024-12-30",
-            "status": "PENDING"
-        },
-        
-        # Cluster 2: Delhi NCR
-        {
-            "order_id": "ORD-2024-004",
-            "origin": "Delhi",
-            "destination": "Gurgaon",
-            "weight_kg": 2000,
-            "value_inr": 95000,
-            "pickup_date": "2024-12-30",
-            "status": "PENDING"
-        },
-        {
-            "order_id": "ORD-2024-005",
-            "origin": "Delhi",
-            "destination": "Noida",
-            "weight_kg": 1500,
-            "value_inr": 72000,
-            "pickup_date": "2024-12-30",
-            "status": "PENDING"
-        },
-        {
-            "order_id": "ORD-2024-006",
-            "origin": "Delhi",
-            "destination": "Faridabad",
-            "weight_kg": 900,
-            "value_inr": 42000,
-            "pickup_date": "2024-12-30",
-            "status": "PENDING"
-        },
-        
-        # Cluster 3: South India
-        {
-            "order_id": "ORD-2024-007",
-            "origin": "Bangalore",
-            "destination": "Mysore",
-            "weight_kg": 3000,
-            "value_inr": 125000,
-            "pickup_date": "2024-12-30",
-            "status": "PENDING"
-        },
-        {
-            "order_id": "ORD-2024-008",
-            "origin": "Bangalore",
-            "destination": "Chennai",
-            "weight_kg": 2500,
-            "value_inr": 110000,
-            "pickup_date": "2024-12-30",
-            "status": "PENDING"
-        },
-        
-        # Standalone orders
-        {
-            "order_id": "ORD-2024-009",
-            "origin": "Ahmedabad",
-            "destination": "Surat",
-            "weight_kg": 4500,
-            "value_inr": 180000,
-            "pickup_date": "2024-12-30",
-            "status": "PENDING"
-        },
-        {
-            "order_id": "ORD-2024-010",
-            "origin": "Hyderabad",
-            "destination": "Bangalore",
-            "weight_kg": 6000,
-            "value_inr": 250000,
-            "pickup_date": "2024-12-30",
-            "status": "PENDING"
-        },
-    ]
+    """Sample pending orders for demonstration (fresh copies, safe to modify)."""
+    return [dict(order) for order in _SAMPLE_PENDING_ORDERS]
 
 
 # =============================================================================
@@ -235,71 +288,188 @@ def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
     
     a = math.sin(delta_lat / 2) ** 2 + \
         math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lon / 2) ** 2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+    c = 2 * math.asin(min(1.0, math.sqrt(a)))  # clamp: rounding can push a past 1 near antipodes
     
     return R * c
 
 
+if NUMBA_AVAILABLE:
+    @vectorize(["float64(float64, float64, float64, float64)"], cache=True)
+    def haversine_vec(lat1, lon1, lat2, lon2):
+        """
+        Great-circle distances (km) for NumPy arrays of coordinates, broadcast together.
+        
+        Compiled by Numba into a single ufunc loop, so no per-step temporary arrays;
+        e.g. lat1[:, None] against lat2[None, :] gives the full N x K matrix.
+        """
+        R = 6371.0  # Earth's radius in kilometers
+        
+        lat1_rad = math.radians(lat1)
+        lat2_rad = math.radians(lat2)
+        delta_lat = math.radians(lat2 - lat1)
+        delta_lon = math.radians(lon2 - lon1)
+        
+        a = math.sin(delta_lat / 2) ** 2 + \
+            math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lon / 2) ** 2
+        c = 2 * math.asin(min(1.0, math.sqrt(a)))
+        
+        return R * c
+else:
+    def haversine_vec(lat1, lon1, lat2, lon2) -> np.ndarray:
+        """
+        Great-circle distances (km) for NumPy arrays of coordinates, broadcast together.
+        
+        Same formula as haversine_distance, one pass over every pair; e.g. lat1[:, None]
+        against lat2[None, :] gives the full N x K matrix.
+        """
+        R = 6371  # Earth's radius in kilometers
+        
+        lat1_rad = np.radians(lat1)
+        lat2_rad = np.radians(lat2)
+        delta_lat = np.radians(lat2 - lat1)
+        delta_lon = np.radians(lon2 - lon1)
+        
+        a = np.sin(delta_lat / 2) ** 2 + np.cos(lat1_rad) * np.cos(lat2_rad) * np.sin(delta_lon / 2) ** 2
+        c = 2 * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+        
+        return R * c
+
+
+def haversine_matrix(points: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Pairwise great-circle distances (km) between (N, 2) and (K, 2) lat/lon arrays."""
+    return haversine_vec(
+        points[:, 0][:, None], points[:, 1][:, None],
+        centroids[:, 0][None, :], centroids[:, 1][None, :]
+    )
+
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, cache=True)
+    def pairwise_haversine(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+        """All-pairs great-circle distances (km) between N points, compiled with Numba."""
+        n = lat.shape[0]
+        R = 6371.0
+        out = np.empty((n, n), dtype=np.float64)
+        for i in prange(n):
+            lat1_rad = np.radians(lat[i])
+            for j in range(n):
+                delta_lat = np.radians(lat[j] - lat[i])
+                delta_lon = np.radians(lon[j] - lon[i])
+                a = np.sin(delta_lat / 2) ** 2 + \
+                    np.cos(lat1_rad) * np.cos(np.radians(lat[j])) * np.sin(delta_lon / 2) ** 2
+                out[i, j] = R * 2 * np.arcsin(np.sqrt(min(a, 1.0)))
+        return out
+else:
+    def pairwise_haversine(lat: np.ndarray, lon: np.ndarray) -> np.ndarray:
+        """All-pairs great-circle distances (km) between N points (NumPy fallback)."""
+        points = np.column_stack((lat, lon))
+        return haversine_matrix(points, points)
+
+
+# All-pairs city distances (km), indexed by city_idx(); the city list is static and small,
+# so it is built once at import. The upper triangle is mirrored so A -> B == B -> A exactly.
+CITY_DIST_KM = pairwise_haversine(CITY_LAT, CITY_LON)
+CITY_DIST_KM = np.triu(CITY_DIST_KM) + np.triu(CITY_DIST_KM, 1).T
+
+
 def get_city_distance(city1: str, city2: str) -> float:
     """Get distance between two cities in km."""
-    coords1 = CITY_COORDINATES.get(city1)
-    coords2 = CITY_COORDINATES.get(city2)
+    i = city_idx(city1)
+    j = city_idx(city2)
     
-    if not coords1 or not coords2:
+    if i < 0 or j < 0:
         return 500  # Default for unknown cities
     
-    return haversine_distance(coords1[0], coords1[1], coords2[0], coords2[1])
+    return float(CITY_DIST_KM[i, j])
+
+
+def city_indices(names: List[str]) -> np.ndarray:
+    """city_idx() for a list of names, as an index array (-1 for unknown cities)."""
+    return np.fromiter((CITY_INDEX.get(name, -1) for name in names), dtype=np.intp, count=len(names))
+
+
+def distances_by_index(i: np.ndarray, j: np.ndarray) -> np.ndarray:
+    """Table distances for (broadcast) index arrays from city_indices(), 500 km if either is unknown."""
+    known = (i >= 0) & (j >= 0)
+    return np.where(known, CITY_DIST_KM[i, j], 500.0)
+
+
+def city_distances(cities_from: List[str], cities_to: List[str]) -> np.ndarray:
+    """get_city_distance for many (from, to) pairs at once, as one gather from the table."""
+    return distances_by_index(city_indices(cities_from), city_indices(cities_to))
 
 
 # =============================================================================
 # K-MEANS CLUSTERING (SIMPLIFIED)
 # =============================================================================
 
-def calculate_cluster_centroid(orders: List[Dict]) -> Tuple[float, float]:
-    """Calculate the geographic centroid of a cluster of orders."""
-    if not orders:
-        return (0, 0)
-    
-    total_lat = 0
-    total_lon = 0
-    count = 0
-    
-    for order in orders:
-        # Use destination coordinates
-        dest = order.get("destination")
-        coords = CITY_COORDINATES.get(dest)
-        if coords:
-            total_lat += coords[0]
-            total_lon += coords[1]
-            count += 1
-    
-    if count == 0:
-        return (0, 0)
-    
-    return (total_lat / count, total_lon / count)
+def assign_orders_to_clusters(points: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the nearest centroid for every (lat, lon) destination point."""
+    return haversine_matrix(points, centroids).argmin(axis=1)
 
 
-def assign_order_to_cluster(order: Dict, centroids: List[Tuple[float, float]]) -> int:
-    """Assign an order to the nearest cluster based on destination."""
-    dest = order.get("destination")
-    dest_coords = CITY_COORDINATES.get(dest, (0, 0))
+def update_centroids(
+    points: np.ndarray,
+    known: np.ndarray,
+    labels: np.ndarray,
+    members: np.ndarray,
+    centroids: np.ndarray
+) -> np.ndarray:
+    """
+    K-Means update step: each cluster's centroid becomes the mean of its members'
+    known destinations (bincount sums, no per-order Python loop).
     
-    min_dist = float('inf')
-    best_cluster = 0
+    Empty clusters keep their old centroid; clusters with members but no known
+    destination fall back to (0, 0).
+    """
+    n_clusters = len(centroids)
+    known_labels = labels[known]
+    counts = np.bincount(known_labels, minlength=n_clusters)
+    sums_lat = np.bincount(known_labels, weights=points[known, 0], minlength=n_clusters)
+    sums_lon = np.bincount(known_labels, weights=points[known, 1], minlength=n_clusters)
+    
+    new_centroids = centroids.copy()
+    new_centroids[members > 0] = 0
+    located = counts > 0
+    new_centroids[located, 0] = sums_lat[located] / counts[located]
+    new_centroids[located, 1] = sums_lon[located] / counts[located]
+    return new_centroids
+
+
+def kmeans_plus_plus_init(
+    candidates: np.ndarray,
+    n_clusters: int,
+    rng: np.random.Generator
+) -> np.ndarray:
+    """
+    k-means++ seeding: pick n_clusters centroids from (M, 2) candidate points.
     
-    for i, centroid in enumerate(centroids):
-        dist = haversine_distance(dest_coords[0], dest_coords[1], centroid[0], centroid[1])
-        if dist < min_dist:
-            min_dist = dist
-            best_cluster = i
+    The first is uniform; each next one is drawn with probability proportional to
+    its squared distance from the nearest centroid so far, so seeds start spread
+    out. With fewer distinct candidates than clusters the last seed is repeated
+    (those duplicates end up as empty clusters).
+    """
+    centroids = np.empty((n_clusters, 2), dtype=np.float64)
+    centroids[0] = candidates[rng.integers(len(candidates))]
+    closest_sq = haversine_matrix(candidates, centroids[:1])[:, 0] ** 2
+    
+    for k in range(1, n_clusters):
+        total = closest_sq.sum()
+        if total == 0:
+            centroids[k:] = centroids[k - 1]
+            break
+        centroids[k] = candidates[rng.choice(len(candidates), p=closest_sq / total)]
+        closest_sq = np.minimum(closest_sq, haversine_matrix(candidates, centroids[k:k + 1])[:, 0] ** 2)
     
-    return best_cluster
+    return centroids
 
 
 def kmeans_cluster_orders(
     orders: List[Dict],
     n_clusters: int = 3,
-    max_iterations: int = 10
+    max_iterations: int = 10,
+    seed: Optional[int] = 0,
+    tol: float = 1e-4
 ) -> List[List[Dict]]:
     """
     Apply K-Means clustering to group orders by geographic proximity.
@@ -308,6 +478,9 @@ def kmeans_cluster_orders(
         orders: List of pending orders
         n_clusters: Number of clusters (default: 3)
         max_iterations: Maximum iterations for convergence
+        seed: Seed for the k-means++ initialisation (fixed by default so the same
+              orders always give the same milk runs; None for a random start)
+        tol: Also stop once no centroid moves more than this many km
     
     Returns:
         List of clusters, where each cluster is a list of orders
@@ -316,106 +489,167 @@ def kmeans_cluster_orders(
         # Each order is its own cluster if few orders
         return [[order] for order in orders]
     
-    # Initialize centroids using first n_clusters orders
-    centroids = []
-    for i in range(min(n_clusters, len(orders))):
-        dest = orders[i].get("destination")
-        coords = CITY_COORDINATES.get(dest, (19.0, 73.0))
-        centroids.append(coords)
+    # Destination coordinates as one (N, 2) array; unknown cities sit at (0, 0) for
+    # assignment but don't pull centroids (they have no location to average)
+    dest_idx = city_indices([order.get("destination") for order in orders])
+    known = dest_idx >= 0
+    points = np.zeros((len(orders), 2), dtype=np.float64)
+    points[known, 0] = CITY_LAT[dest_idx[known]]
+    points[known, 1] = CITY_LON[dest_idx[known]]
+    
+    # Initialize centroids with k-means++ over the distinct known destinations
+    if known.any():
+        candidates = np.unique(points[known], axis=0)
+        centroids = kmeans_plus_plus_init(candidates, n_clusters, np.random.default_rng(seed))
+    else:
+        centroids = np.tile((19.0, 73.0), (n_clusters, 1))
     
     # K-Means iterations
+    prev_labels = None
     for _ in range(max_iterations):
-        # Assign orders to clusters
-        clusters = [[] for _ in range(n_clusters)]
-        
-        for order in orders:
-            cluster_idx = assign_order_to_cluster(order, centroids)
-            clusters[cluster_idx].append(order)
-        
-        # Update centroids
-        new_centroids = []
-        for cluster in clusters:
-            if cluster:
-                new_centroids.append(calculate_cluster_centroid(cluster))
-            else:
-                # Keep old centroid if cluster is empty
-                new_centroids.append(centroids[len(new_centroids)] if len(new_centroids) < len(centroids) else (19.0, 73.0))
+        # Assign every order to its nearest centroid in one N x K distance pass
+        labels = assign_orders_to_clusters(points, centroids)
+        members = np.bincount(labels, minlength=n_clusters)
         
-        # Check convergence
-        if new_centroids == centroids:
+        # Converged: same assignment as last pass, so the update would reproduce the centroids
+        if prev_labels is not None and np.array_equal(labels, prev_labels):
             break
+        prev_labels = labels
         
+        new_centroids = update_centroids(points, known, labels, members, centroids)
+        shift_km = haversine_vec(
+            centroids[:, 0], centroids[:, 1], new_centroids[:, 0], new_centroids[:, 1]
+        ).max()
         centroids = new_centroids
+        if shift_km < tol:
+            break
     
     # Remove empty clusters
-    return [c for c in clusters if c]
+    return [
+        [orders[i] for i in np.flatnonzero(labels == k)]
+        for k in range(n_clusters)
+        if members[k]
+    ]
 
 
 # =============================================================================
 # MILK RUN OPTIMIZATION
 # =============================================================================
 
+def select_truck_indices(weights_kg: np.ndarray) -> np.ndarray:
+    """
+    Index into TRUCK_IDS of the smallest truck that can handle each load.
+    
+    Loads heavier than every truck get the largest one.
+    """
+    return np.minimum(np.searchsorted(TRUCK_CAP, weights_kg, side="left"), len(TRUCK_IDS) - 1)
+
+
 def select_optimal_truck(total_weight_kg: float) -> Dict:
     """Select the smallest truck that can handle the load."""
-    for truck_id, truck in sorted(TRUCK_TYPES.items(), key=lambda x: x[1]["capacity_kg"]):
-        if truck["capacity_kg"] >= total_weight_kg:
-            return {"id": truck_id, **truck}
+    # Scalar twin of select_truck_indices; bisect avoids NumPy's per-call array overhead
+    truck_id = TRUCK_IDS[min(bisect_left(_TRUCK_CAPS, total_weight_kg), len(TRUCK_IDS) - 1)]
+    return {"id": truck_id, **TRUCK_TYPES[truck_id]}
+
+
+def individual_order_costs(orders: List[Dict]) -> np.ndarray:
+    """Cost of shipping each order on its own truck, as a (len(orders),) array."""
+    weights = np.array([order.get("weight_kg", 1000) for order in orders], dtype=np.float64)
+    distances = city_distances(
+        [order.get("origin") for order in orders],
+        [order.get("destination") for order in orders]
+    )
     
-    # If no single truck fits, return largest
-    return {"id": "40FT_TRAILER", **TRUCK_TYPES["40FT_TRAILER"]}
+    # Smallest truck per order, then every order's cost in one broadcast expression
+    trucks = select_truck_indices(weights)
+    return TRUCK_FIXED[trucks] + distances * TRUCK_CPKM[trucks]
 
 
 def calculate_individual_costs(orders: List[Dict]) -> float:
     """Calculate total cost if each order is shipped individually."""
-    total_cost = 0
-    
-    for order in orders:
-        weight = order.get("weight_kg", 1000)
-        origin = order.get("origin")
-        dest = order.get("destination")
-        distance = get_city_distance(origin, dest)
-        
-        # Select smallest truck for individual order
-        truck = select_optimal_truck(weight)
-        cost = truck["fixed_cost"] + (distance * truck["cost_per_km"])
-        total_cost += cost
+    if not orders:
+        return 0
     
-    return total_cost
+    # Summed in order (not np.sum's pairwise reduction) so totals round exactly as before
+    return sum(individual_order_costs(orders).tolist())
 
 
-def calculate_milkrun_cost(orders: List[Dict]) -> Tuple[float, Dict]:
-    """Calculate cost for a consolidated milk run."""
+def plan_route(origin: str, destinations: List[str]) -> Tuple[List[str], float]:
+    """
+    Order a milk run's stops: nearest-neighbour tour from the origin, improved
+    with 2-opt until no segment reversal shortens it.
+    
+    Each distinct destination is visited once before returning to the origin.
+    Returns (stops in visiting order, excluding the origin; round-trip distance km).
+    """
+    stops = [origin] + list(dict.fromkeys(destinations))
+    n = len(stops)
+    
+    # Resolve each stop once; the (n, n) leg matrix is then a single broadcast gather
+    idx = city_indices(stops)
+    legs = distances_by_index(idx[:, None], idx[None, :])
+    dist = legs.tolist()
+    
+    # Nearest neighbour: always drive to the closest unvisited stop
+    tour = [0]
+    unvisited = set(range(1, n))
+    while unvisited:
+        here = tour[-1]
+        nearest = min(unvisited, key=lambda j: (dist[here][j], j))
+        tour.append(nearest)
+        unvisited.remove(nearest)
+    tour.append(0)
+    
+    # 2-opt: reverse tour[i..j] whenever reconnecting the two cut edges is shorter
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, n - 1):
+            for j in range(i + 1, n):
+                a, b, c, d = tour[i - 1], tour[i], tour[j], tour[j + 1]
+                if dist[a][c] + dist[b][d] < dist[a][b] + dist[c][d] - 1e-9:
+                    tour[i:j + 1] = reversed(tour[i:j + 1])
+                    improved = True
+    
+    # Round-trip length (including the hop back to the origin) as one gather + sum
+    total_distance = float(legs[tour[:-1], tour[1:]].sum())
+    return [stops[k] for k in tour[1:-1]], total_distance
+
+
+def calculate_milkrun_cost(orders: List[Dict], total_weight: Optional[float] = None) -> Tuple[float, Dict]:
+    """
+    Calculate cost for a consolidated milk run.
+    
+    Pass total_weight if the caller has already summed the orders' weight_kg.
+    """
     if not orders:
         return 0, {}
     
-    total_weight = sum(o.get("weight_kg", 0) for o in orders)
+    if total_weight is None:
+        total_weight = sum(o.get("weight_kg", 0) for o in orders)
     truck = select_optimal_truck(total_weight)
     
-    # Calculate total route distance
-    # Simple: sum of distances from origin to each destination
+    # Round trip from the first order's origin through every destination, in the
+    # shortest visiting order plan_route finds (not the order the orders arrived in)
     origin = orders[0].get("origin")
-    destinations = [o.get("destination") for o in orders]
-    
-    total_distance = 0
-    current_location = origin
-    
-    for dest in destinations:
-        total_distance += get_city_distance(current_location, dest)
-        current_location = dest
-    
-    # Add return distance
-    total_distance += get_city_distance(current_location, origin)
+    route, total_distance = plan_route(origin, [o.get("destination") for o in orders])
     
     cost = truck["fixed_cost"] + (total_distance * truck["cost_per_km"])
     
     return cost, {
         "truck": truck,
+        "route": [origin] + route,
         "total_distance_km": round(total_distance, 1),
         "total_weight_kg": total_weight,
         "capacity_utilization": round((total_weight / truck["capacity_kg"]) * 100, 1)
     }
 
 
+# Fields echoed back for each order in a milk run, fetched in one C-level call
+_ORDER_FIELDS = ("order_id", "destination", "weight_kg", "value_inr")
+_get_order_fields = itemgetter(*_ORDER_FIELDS)
+
+
 def optimize_milk_runs(
     orders: Optional[List[Dict]] = None,
     max_clusters: int = 5
@@ -431,7 +665,7 @@ def optimize_milk_runs(
         Optimization result with suggested milk runs and savings
     """
     if orders is None:
-        orders = get_sample_pending_orders()
+        orders = _SAMPLE_PENDING_ORDERS  # only read below, so no copy needed
     
     if not orders:
         return {
@@ -447,6 +681,16 @@ def optimize_milk_runs(
     # Apply K-Means clustering
     clusters = kmeans_cluster_orders(orders, n_clusters)
     
+    # Individual-shipping cost of every order in one vectorised pass, then
+    # bincount-summed per cluster (sequentially, like calculate_individual_costs)
+    cluster_sizes = [len(cluster) for cluster in clusters]
+    cluster_ids = np.repeat(np.arange(len(clusters)), cluster_sizes)
+    cluster_individual_costs = np.bincount(
+        cluster_ids,
+        weights=individual_order_costs([o for cluster in clusters for o in cluster]),
+        minlength=len(clusters)
+    ).tolist()
+    
     # Analyze each cluster
     milk_runs = []
     total_individual_cost = 0
@@ -456,36 +700,43 @@ def optimize_milk_runs(
         if not cluster:
             continue
         
+        # One pass over the cluster for its totals and order summaries
+        total_weight = 0
+        total_value = 0
+        order_summaries = []
+        for o in cluster:
+            try:
+                fields = _get_order_fields(o)
+            except KeyError:
+                # Partial order dicts from API callers: missing fields become None
+                fields = tuple(map(o.get, _ORDER_FIELDS))
+            weight, value = fields[2], fields[3]
+            total_weight += weight if weight is not None else 0
+            total_value += value if value is not None else 0
+            order_summaries.append(dict(zip(_ORDER_FIELDS, fields)))
+        
         # Calculate costs
-        individual_cost = calculate_individual_costs(cluster)
-        milkrun_cost, milkrun_details = calculate_milkrun_cost(cluster)
+        individual_cost = cluster_individual_costs[i]
+        milkrun_cost, milkrun_details = calculate_milkrun_cost(cluster, total_weight)
         savings = individual_cost - milkrun_cost
         savings_percent = (savings / individual_cost * 100) if individual_cost > 0 else 0
         
         total_individual_cost += individual_cost
         total_milkrun_cost += milkrun_cost
         
-        # Get cluster cities
-        destinations = list(set(o.get("destination") for o in cluster))
+        # Get cluster cities, in visiting order
         origin = cluster[0].get("origin")
+        destinations = milkrun_details["route"][1:]
         
         milk_run = {
             "cluster_id": i + 1,
             "cluster_name": f"Milk Run {i + 1}: {origin} Hub",
             "origin": origin,
             "destinations": destinations,
-            "orders": [
-                {
-                    "order_id": o.get("order_id"),
-                    "destination": o.get("destination"),
-                    "weight_kg": o.get("weight_kg"),
-                    "value_inr": o.get("value_inr")
-                }
-                for o in cluster
-            ],
+            "orders": order_summaries,
             "total_orders": len(cluster),
-            "total_weight_kg": sum(o.get("weight_kg", 0) for o in cluster),
-            "total_value_inr": sum(o.get("value_inr", 0) for o in cluster),
+            "total_weight_kg": total_weight,
+            "total_value_inr": total_value,
             
             # Costs
             "individual_shipping_cost": round(individual_cost),
@@ -500,7 +751,7 @@ def optimize_milk_runs(
             "total_distance_km": milkrun_details.get("total_distance_km"),
             
             # Route
-            "route": [origin] + destinations,
+            "route": milkrun_details["route"],
             
             # Recommendation
             "is_recommended": savings_percent >= 15 and len(cluster) >= 2
@@ -526,15 +777,26 @@ def optimize_milk_runs(
             "total_savings_percent": round(total_savings_percent, 1)
         },
         
-        "milk_runs": sorted(milk_runs, key=lambda x: x["savings_inr"], reverse=True),
+        "milk_runs": sorted(milk_runs, key=itemgetter("savings_inr"), reverse=True),
         
         "recommendation": f"Consolidating {len(orders)} orders into {len(milk_runs)} milk runs saves ₹{round(total_savings):,} ({round(total_savings_percent, 1)}%)"
     }
 
 
+# The demo runs over the fixed sample orders with a fixed seed, so its result only
+# varies in optimization_date; it is computed on first use and reused after that
+_DEMO_OPTIMIZATION: Optional[Dict] = None
+
+
 def get_demo_optimization() -> Dict:
     """Get demo milk run optimization for UI display."""
-    return optimize_milk_runs()
+    global _DEMO_OPTIMIZATION
+    if _DEMO_OPTIMIZATION is None:
+        _DEMO_OPTIMIZATION = optimize_milk_runs()
+    
+    result = copy.deepcopy(_DEMO_OPTIMIZATION)
+    result["optimization_date"] = datetime.now().strftime("%Y-%m-%d %H:%M")
+    return result
 
 
 # =============================================================================
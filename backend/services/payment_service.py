@@ -4,20 +4,132 @@ Handles: Batches, Transactions, Bank Reconciliation, Early Payment Discounts
 """
 
 import uuid
-import mysql.connector
+from mysql.connector import PoolError, pooling
+from contextlib import contextmanager
 from datetime import datetime, timedelta
-from typing import List, Dict, Optional, Any
-from decimal import Decimal
+from typing import List, Dict, Optional, Any, Tuple
 import os
 import sys
+import threading
+
+from cachetools import TTLCache
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from db_config import DB_CONFIG
+from services.db_service import acquire_pooled, PoolExhaustedError
+
+# Database Connection - using db_config.py, pooled so calls skip the TCP + auth handshake.
+# close() on a pooled connection hands it back instead of disconnecting
+POOL_SIZE = int(os.getenv('PAYMENT_DB_POOL_SIZE', 25))
+# mysql.connector refuses pools larger than pooling.CNX_POOL_MAXSIZE (32)
+if not 1 <= POOL_SIZE <= pooling.CNX_POOL_MAXSIZE:
+    print(f"[PaymentService] PAYMENT_DB_POOL_SIZE={POOL_SIZE} out of range, "
+          f"clamping to 1..{pooling.CNX_POOL_MAXSIZE}")
+    POOL_SIZE = min(max(POOL_SIZE, 1), pooling.CNX_POOL_MAXSIZE)
+
+_pool: Optional[pooling.MySQLConnectionPool] = None
+_pool_lock = threading.Lock()
+
 
-# Database Connection - using db_config.py
 def get_db_connection():
-    return mysql.connector.connect(**DB_CONFIG)
+    """
+    Get a MySQL connection from the shared pool (created on first use); waits up to
+    POOL_ACQUIRE_TIMEOUT for one to come free, then raises PoolExhaustedError
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = pooling.MySQLConnectionPool(
+                    pool_name='payment_service',
+                    pool_size=POOL_SIZE,
+                    pool_reset_session=True,
+                    use_pure=False,  # C extension protocol/row decoding when it is installed
+                    **DB_CONFIG
+                )
+    return acquire_pooled(_pool.get_connection, PoolError)
+
+
+# FX rates change at most daily: serve repeat lookups from memory for an hour,
+# dropped for a pair whenever set_exchange_rate writes it
+RATE_CACHE_TTL = int(os.getenv('RATE_CACHE_TTL', 3600))
+
+_rate_cache = TTLCache(maxsize=256, ttl=RATE_CACHE_TTL)
+_rate_cache_lock = threading.Lock()  # cachetools caches are not thread-safe
+
+# Early-discount checks repeat between a batch preview and its confirmation: keep each
+# (invoice_id, day) result briefly, as (vendor_id, result) so a vendor's terms change can
+# drop just that vendor's entries
+DISCOUNT_CACHE_TTL = int(os.getenv('DISCOUNT_CACHE_TTL', 300))
+
+_discount_cache = TTLCache(maxsize=4096, ttl=DISCOUNT_CACHE_TTL)
+_discount_cache_lock = threading.Lock()
+
+
+def invalidate_discount_cache(vendor_id: Optional[str] = None):
+    """Forget cached early-discount results; vendor_id=None drops all of them"""
+    with _discount_cache_lock:
+        if vendor_id is None:
+            _discount_cache.clear()
+            return
+        for key in [key for key, (vendor, _) in _discount_cache.items() if vendor == vendor_id]:
+            _discount_cache.pop(key, None)
+
+# Columns returned by the read APIs (everything the payment screens show; no
+# multi-currency/internal bookkeeping columns, no invoice line-item JSON)
+QUEUE_INVOICE_COLUMNS = """
+    si.id, si.invoice_number, si.supplier_id, si.amount, si.status,
+    si.po_number, si.invoice_date, si.due_date, si.created_at
+"""
+
+BATCH_COLUMNS = """
+    id, batch_number, total_amount, currency, invoice_count, status, payment_method,
+    created_by, approved_by, approved_at, bank_reference, bank_account, scheduled_date, paid_at,
+    notes, created_at
+"""
+
+TRANSACTION_COLUMNS = """
+    pt.id, pt.batch_id, pt.invoice_id, pt.vendor_id, pt.vendor_name, pt.original_amount,
+    pt.discount_amount, pt.final_amount, pt.currency, pt.status, pt.payment_reference,
+    pt.paid_at, pt.created_at
+"""
+
+RECONCILIATION_COLUMNS = """
+    id, statement_id, transaction_date, bank_reference, description, amount,
+    type, currency, status, created_at
+"""
+
+TRANSACTION_INSERT_FIELDS = (
+    'id', 'batch_id', 'invoice_id', 'vendor_id', 'vendor_name', 'original_amount',
+    'discount_amount', 'final_amount', 'currency', 'status'
+)
+
+TRANSACTION_INSERT_SQL = f"""
+    INSERT INTO payment_transactions ({', '.join(TRANSACTION_INSERT_FIELDS)})
+    VALUES ({', '.join(['%s'] * len(TRANSACTION_INSERT_FIELDS))})
+"""
+
+# Bulk writes go through plain cursors' executemany, which sends one multi-row INSERT.
+# Prepared cursors (conn.cursor(prepared=True)) would execute once per row instead, and
+# pool_reset_session deallocates server-side statements whenever a connection is returned.
+
+# Rows per multi-row INSERT for bulk imports
+BULK_INSERT_CHUNK = 1000
+
+
+@contextmanager
+def mysql_conn():
+    """Borrow a pooled connection; rolled back on error and always handed back to the pool"""
+    conn = get_db_connection()
+    try:
+        yield conn
+    except Exception:
+        if conn.is_connected():
+            conn.rollback()
+        raise
+    finally:
+        conn.close()
 
 
 class PaymentService:
@@ -33,26 +145,27 @@ class PaymentService:
         These are invoices that have completed the approval workflow.
         """
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor(dictionary=True)
-            
-            # Get approved invoices not yet in a batch
-            cursor.execute("""
-                SELECT si.*, 
-                       COALESCE(pt.status, 'AWAITING_PAYMENT') as payment_status,
-                       pt.batch_id
-                FROM supplier_invoices si
-                LEFT JOIN payment_transactions pt ON si.id = pt.invoice_id
-                WHERE si.status = %s
-                  AND (pt.id IS NULL OR pt.status = 'PENDING')
-                ORDER BY si.due_date ASC
-            """, (status_filter,))
-            
-            invoices = cursor.fetchall()
-            cursor.close()
-            conn.close()
-            
-            return invoices
+            with mysql_conn() as conn:
+                cursor = conn.cursor(dictionary=True)
+                
+                # Get approved invoices not yet in a batch
+                cursor.execute(f"""
+                    SELECT {QUEUE_INVOICE_COLUMNS}, 
+                           COALESCE(pt.status, 'AWAITING_PAYMENT') as payment_status,
+                           pt.batch_id
+                    FROM supplier_invoices si
+                    LEFT JOIN payment_transactions pt ON si.id = pt.invoice_id
+                    WHERE si.status = %s
+                      AND (pt.id IS NULL OR pt.status = 'PENDING')
+                    ORDER BY si.due_date ASC
+                """, (status_filter,))
+                
+                invoices = cursor.fetchall()
+                cursor.close()
+                
+                return invoices
+        except PoolExhaustedError:
+            raise
         except Exception as e:
             print(f"[PaymentService] Error getting payment queue: {e}")
             return []
@@ -75,87 +188,78 @@ class PaymentService:
         Optionally applies early payment discounts.
         """
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor(dictionary=True)
-            
-            # Generate batch ID and number
-            batch_id = str(uuid.uuid4())
-            batch_number = f"PAY-{datetime.now().strftime('%Y%m%d')}-{batch_id[:6].upper()}"
-            
-            # Calculate totals from invoices (mock - would query real data)
-            total_amount = Decimal('0.00')
-            transactions = []
-            
-            for inv_id in invoice_ids:
-                # Get invoice details
-                cursor.execute("SELECT * FROM supplier_invoices WHERE id = %s", (inv_id,))
-                invoice = cursor.fetchone()
-                
-                if invoice:
-                    original_amount = Decimal(str(invoice['amount']))
-                    discount_amount = Decimal('0.00')
-                    
-                    # Apply early payment discount if enabled
-                    if apply_early_discount:
-                        discount_info = self.calculate_early_discount(inv_id)
-                        if discount_info and discount_info.get('eligible'):
-                            discount_amount = original_amount * (Decimal(str(discount_info['discount_percent'])) / 100)
-                    
-                    final_amount = original_amount - discount_amount
-                    total_amount += final_amount
+            with mysql_conn() as conn:
+                # Reads and inserts run as one transaction: a single commit, rolled back whole on error
+                conn.start_transaction(isolation_level='READ COMMITTED')
+                cursor = conn.cursor(dictionary=True)
+                
+                # Generate batch ID and number
+                batch_id = str(uuid.uuid4())
+                batch_number = f"PAY-{datetime.now().strftime('%Y%m%d')}-{batch_id[:6].upper()}"
+                
+                # Calculate totals from invoices, fetched in one round-trip
+                # Money is kept as integer paise until it leaves this method
+                total_paise = 0
+                rows = []  # positional, in TRANSACTION_INSERT_FIELDS order
+                
+                invoices_by_id = self._fetch_invoices_with_terms(cursor, invoice_ids)
+                today = datetime.now().date()
+                
+                for inv_id in invoice_ids:
+                    invoice = invoices_by_id.get(inv_id)
                     
-                    transactions.append({
-                        'id': str(uuid.uuid4()),
-                        'batch_id': batch_id,
-                        'invoice_id': inv_id,
-                        'vendor_id': invoice.get('supplier_id'),
-                        'vendor_name': invoice.get('supplier_id'),  # Would lookup vendor name
-                        'original_amount': float(original_amount),
-                        'discount_amount': float(discount_amount),
-                        'final_amount': float(final_amount),
-                        'currency': 'INR',
-                        'status': 'INCLUDED'
-                    })
-            
-            # Insert batch
-            cursor.execute("""
-                INSERT INTO payment_batches 
-                (id, batch_number, total_amount, currency, invoice_count, status, payment_method, 
-                 created_by, scheduled_date, notes)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """, (
-                batch_id, batch_number, float(total_amount), 'INR', len(invoice_ids),
-                'PENDING_APPROVAL', payment_method, created_by, 
-                scheduled_date or datetime.now().strftime('%Y-%m-%d'), notes
-            ))
-            
-            # Insert transactions
-            for txn in transactions:
+                    if invoice:
+                        original_paise = round(invoice['amount'] * 100)
+                        discount_paise = 0
+                        
+                        # Apply early payment discount if enabled; rounded half-up to
+                        # whole paise, as the DECIMAL(15, 2) column stores it
+                        if apply_early_discount and self._early_discount(invoice, today).get('eligible'):
+                            discount_bp = round(invoice['term_discount_percent'] * 100)
+                            discount_paise = (original_paise * discount_bp + 5000) // 10000
+                        
+                        final_paise = original_paise - discount_paise
+                        total_paise += final_paise
+                        
+                        rows.append((
+                            str(uuid.uuid4()), batch_id, inv_id,
+                            invoice.get('supplier_id'),
+                            invoice.get('supplier_id'),  # vendor_name: would lookup vendor name
+                            original_paise / 100, discount_paise / 100, final_paise / 100,
+                            'INR', 'INCLUDED'
+                        ))
+                
+                # Insert batch
                 cursor.execute("""
-                    INSERT INTO payment_transactions
-                    (id, batch_id, invoice_id, vendor_id, vendor_name, original_amount, 
-                     discount_amount, final_amount, currency, status)
+                    INSERT INTO payment_batches 
+                    (id, batch_number, total_amount, currency, invoice_count, status, payment_method, 
+                     created_by, scheduled_date, notes)
                     VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                 """, (
-                    txn['id'], txn['batch_id'], txn['invoice_id'], txn['vendor_id'],
-                    txn['vendor_name'], txn['original_amount'], txn['discount_amount'],
-                    txn['final_amount'], txn['currency'], txn['status']
+                    batch_id, batch_number, total_paise / 100, 'INR', len(invoice_ids),
+                    'PENDING_APPROVAL', payment_method, created_by, 
+                    scheduled_date or datetime.now().strftime('%Y-%m-%d'), notes
                 ))
-            
-            conn.commit()
-            cursor.close()
-            conn.close()
-            
-            return {
-                'success': True,
-                'batch_id': batch_id,
-                'batch_number': batch_number,
-                'total_amount': float(total_amount),
-                'invoice_count': len(invoice_ids),
-                'status': 'PENDING_APPROVAL',
-                'transactions': transactions
-            }
-            
+                
+                # Insert transactions (executemany batches them into one multi-row INSERT)
+                if rows:
+                    cursor.executemany(TRANSACTION_INSERT_SQL, rows)
+                
+                conn.commit()
+                cursor.close()
+                
+                return {
+                    'success': True,
+                    'batch_id': batch_id,
+                    'batch_number': batch_number,
+                    'total_amount': total_paise / 100,
+                    'invoice_count': len(invoice_ids),
+                    'status': 'PENDING_APPROVAL',
+                    'transactions': [dict(zip(TRANSACTION_INSERT_FIELDS, row)) for row in rows]
+                }
+                
+        except PoolExhaustedError:
+            raise
         except Exception as e:
             print(f"[PaymentService] Error creating batch: {e}")
             return {'success': False, 'error': str(e)}
@@ -163,23 +267,24 @@ class PaymentService:
     def get_payment_batches(self, status_filter: Optional[str] = None) -> List[Dict]:
         """Get all payment batches, optionally filtered by status."""
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor(dictionary=True)
-            
-            if status_filter:
-                cursor.execute("""
-                    SELECT * FROM payment_batches 
-                    WHERE status = %s 
-                    ORDER BY created_at DESC
-                """, (status_filter,))
-            else:
-                cursor.execute("SELECT * FROM payment_batches ORDER BY created_at DESC")
-            
-            batches = cursor.fetchall()
-            cursor.close()
-            conn.close()
-            
-            return batches
+            with mysql_conn() as conn:
+                cursor = conn.cursor(dictionary=True)
+                
+                if status_filter:
+                    cursor.execute(f"""
+                        SELECT {BATCH_COLUMNS} FROM payment_batches 
+                        WHERE status = %s 
+                        ORDER BY created_at DESC
+                    """, (status_filter,))
+                else:
+                    cursor.execute(f"SELECT {BATCH_COLUMNS} FROM payment_batches ORDER BY created_at DESC")
+                
+                batches = cursor.fetchall()
+                cursor.close()
+                
+                return batches
+        except PoolExhaustedError:
+            raise
         except Exception as e:
             print(f"[PaymentService] Error getting batches: {e}")
             return []
@@ -187,30 +292,31 @@ class PaymentService:
     def get_batch_detail(self, batch_id: str) -> Optional[Dict]:
         """Get batch details including all transactions."""
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor(dictionary=True)
-            
-            # Get batch
-            cursor.execute("SELECT * FROM payment_batches WHERE id = %s", (batch_id,))
-            batch = cursor.fetchone()
-            
-            if not batch:
-                return None
-            
-            # Get transactions
-            cursor.execute("""
-                SELECT * FROM payment_transactions 
-                WHERE batch_id = %s 
-                ORDER BY created_at
-            """, (batch_id,))
-            transactions = cursor.fetchall()
-            
-            cursor.close()
-            conn.close()
-            
-            batch['transactions'] = transactions
-            return batch
-            
+            with mysql_conn() as conn:
+                cursor = conn.cursor(dictionary=True)
+                
+                # Get batch
+                cursor.execute(f"SELECT {BATCH_COLUMNS} FROM payment_batches WHERE id = %s", (batch_id,))
+                batch = cursor.fetchone()
+                
+                if not batch:
+                    return None
+                
+                # Get transactions
+                cursor.execute(f"""
+                    SELECT {TRANSACTION_COLUMNS} FROM payment_transactions pt
+                    WHERE pt.batch_id = %s 
+                    ORDER BY pt.created_at
+                """, (batch_id,))
+                transactions = cursor.fetchall()
+                
+                cursor.close()
+                
+                batch['transactions'] = transactions
+                return batch
+                
+        except PoolExhaustedError:
+            raise
         except Exception as e:
             print(f"[PaymentService] Error getting batch detail: {e}")
             return None
@@ -218,25 +324,26 @@ class PaymentService:
     def approve_batch(self, batch_id: str, approver_id: str) -> Dict:
         """Approve a payment batch for processing."""
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                UPDATE payment_batches 
-                SET status = 'APPROVED', approved_by = %s, approved_at = NOW()
-                WHERE id = %s AND status = 'PENDING_APPROVAL'
-            """, (approver_id, batch_id))
-            
-            affected = cursor.rowcount
-            conn.commit()
-            cursor.close()
-            conn.close()
-            
-            if affected > 0:
-                return {'success': True, 'message': 'Batch approved successfully'}
-            else:
-                return {'success': False, 'error': 'Batch not found or already processed'}
+            with mysql_conn() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute("""
+                    UPDATE payment_batches 
+                    SET status = 'APPROVED', approved_by = %s, approved_at = NOW()
+                    WHERE id = %s AND status = 'PENDING_APPROVAL'
+                """, (approver_id, batch_id))
                 
+                affected = cursor.rowcount
+                conn.commit()
+                cursor.close()
+                
+                if affected > 0:
+                    return {'success': True, 'message': 'Batch approved successfully'}
+                else:
+                    return {'success': False, 'error': 'Batch not found or already processed'}
+                    
+        except PoolExhaustedError:
+            raise
         except Exception as e:
             print(f"[PaymentService] Error approving batch: {e}")
             return {'success': False, 'error': str(e)}
@@ -247,39 +354,40 @@ class PaymentService:
         In production, this would integrate with bank API.
         """
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            
-            # Update batch status to PROCESSING
-            cursor.execute("""
-                UPDATE payment_batches 
-                SET status = 'PROCESSING'
-                WHERE id = %s AND status = 'APPROVED'
-            """, (batch_id,))
-            
-            # Update all transactions to PROCESSING
-            cursor.execute("""
-                UPDATE payment_transactions
-                SET status = 'PROCESSING'
-                WHERE batch_id = %s
-            """, (batch_id,))
-            
-            conn.commit()
-            
-            # Simulate bank processing (in production, this would be async)
-            # Generate mock bank reference
-            bank_ref = f"BANK-{datetime.now().strftime('%Y%m%d%H%M%S')}-{batch_id[:6].upper()}"
-            
-            cursor.close()
-            conn.close()
-            
-            return {
-                'success': True,
-                'status': 'PROCESSING',
-                'bank_reference': bank_ref,
-                'message': 'Batch sent to bank for processing'
-            }
-            
+            with mysql_conn() as conn:
+                cursor = conn.cursor()
+                
+                # Update batch status to PROCESSING
+                cursor.execute("""
+                    UPDATE payment_batches 
+                    SET status = 'PROCESSING'
+                    WHERE id = %s AND status = 'APPROVED'
+                """, (batch_id,))
+                
+                # Update all transactions to PROCESSING
+                cursor.execute("""
+                    UPDATE payment_transactions
+                    SET status = 'PROCESSING'
+                    WHERE batch_id = %s
+                """, (batch_id,))
+                
+                conn.commit()
+                
+                # Simulate bank processing (in production, this would be async)
+                # Generate mock bank reference
+                bank_ref = f"BANK-{datetime.now().strftime('%Y%m%d%H%M%S')}-{batch_id[:6].upper()}"
+                
+                cursor.close()
+                
+                return {
+                    'success': True,
+                    'status': 'PROCESSING',
+                    'bank_reference': bank_ref,
+                    'message': 'Batch sent to bank for processing'
+                }
+                
+        except PoolExhaustedError:
+            raise
         except Exception as e:
             print(f"[PaymentService] Error processing batch: {e}")
             return {'success': False, 'error': str(e)}
@@ -287,37 +395,30 @@ class PaymentService:
     def mark_batch_paid(self, batch_id: str, bank_reference: str) -> Dict:
         """Mark a batch as paid after bank confirmation."""
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            
-            # Update batch
-            cursor.execute("""
-                UPDATE payment_batches 
-                SET status = 'PAID', bank_reference = %s, paid_at = NOW()
-                WHERE id = %s
-            """, (bank_reference, batch_id))
-            
-            # Update all transactions
-            cursor.execute("""
-                UPDATE payment_transactions
-                SET status = 'PAID', payment_reference = %s, paid_at = NOW()
-                WHERE batch_id = %s
-            """, (bank_reference, batch_id))
-            
-            # Update original invoices to PAID
-            cursor.execute("""
-                UPDATE supplier_invoices si
-                INNER JOIN payment_transactions pt ON si.id = pt.invoice_id
-                SET si.status = 'PAID'
-                WHERE pt.batch_id = %s
-            """, (batch_id,))
-            
-            conn.commit()
-            cursor.close()
-            conn.close()
-            
-            return {'success': True, 'message': 'Batch marked as paid'}
-            
+            with mysql_conn() as conn:
+                # Batch, transactions and invoices flip to PAID together or not at all
+                conn.start_transaction(isolation_level='READ COMMITTED')
+                cursor = conn.cursor()
+                
+                # Batch, its transactions and their original invoices in one multi-table
+                # UPDATE (LEFT JOINs so an empty batch is still marked paid)
+                cursor.execute("""
+                    UPDATE payment_batches pb
+                    LEFT JOIN payment_transactions pt ON pt.batch_id = pb.id
+                    LEFT JOIN supplier_invoices si ON si.id = pt.invoice_id
+                    SET pb.status = 'PAID', pb.bank_reference = %s, pb.paid_at = NOW(),
+                        pt.status = 'PAID', pt.payment_reference = %s, pt.paid_at = NOW(),
+                        si.status = 'PAID'
+                    WHERE pb.id = %s
+                """, (bank_reference, bank_reference, batch_id))
+                
+                conn.commit()
+                cursor.close()
+                
+                return {'success': True, 'message': 'Batch marked as paid'}
+                
+        except PoolExhaustedError:
+            raise
         except Exception as e:
             print(f"[PaymentService] Error marking batch paid: {e}")
             return {'success': False, 'error': str(e)}
@@ -332,57 +433,77 @@ class PaymentService:
         Accepts list of: {date, reference, description, amount, type}
         """
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            
-            stmt_id = statement_id or f"STMT-{datetime.now().strftime('%Y%m%d%H%M%S')}"
-            imported = 0
-            
-            for txn in transactions:
-                recon_id = str(uuid.uuid4())
-                cursor.execute("""
-                    INSERT INTO bank_reconciliations
-                    (id, statement_id, transaction_date, bank_reference, description, 
-                     amount, type, status)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, 'UNMATCHED')
-                """, (
-                    recon_id, stmt_id, txn.get('date'), txn.get('reference'),
-                    txn.get('description'), txn.get('amount'), txn.get('type', 'DEBIT')
-                ))
-                imported += 1
-            
-            conn.commit()
-            cursor.close()
-            conn.close()
-            
-            return {
-                'success': True,
-                'statement_id': stmt_id,
-                'imported_count': imported,
-                'message': f'Imported {imported} transactions'
-            }
-            
+            with mysql_conn() as conn:
+                cursor = conn.cursor()
+                
+                stmt_id = statement_id or f"STMT-{datetime.now().strftime('%Y%m%d%H%M%S')}"
+                rows = [
+                    (
+                        str(uuid.uuid4()), stmt_id, txn.get('date'), txn.get('reference'),
+                        txn.get('description'), txn.get('amount'), txn.get('type', 'DEBIT')
+                    )
+                    for txn in transactions
+                ]
+                
+                # Each chunk goes out as one multi-row INSERT; chunking keeps a large
+                # statement under max_allowed_packet
+                for start in range(0, len(rows), BULK_INSERT_CHUNK):
+                    cursor.executemany("""
+                        INSERT INTO bank_reconciliations
+                        (id, statement_id, transaction_date, bank_reference, description, 
+                         amount, type, status)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s, 'UNMATCHED')
+                    """, rows[start:start + BULK_INSERT_CHUNK])
+                imported = len(rows)
+                
+                conn.commit()
+                cursor.close()
+                
+                return {
+                    'success': True,
+                    'statement_id': stmt_id,
+                    'imported_count': imported,
+                    'message': f'Imported {imported} transactions'
+                }
+                
+        except PoolExhaustedError:
+            raise
         except Exception as e:
             print(f"[PaymentService] Error importing statement: {e}")
             return {'success': False, 'error': str(e)}
     
-    def get_unmatched_transactions(self) -> List[Dict]:
-        """Get bank transactions that haven't been matched yet."""
+    def get_unmatched_transactions(self, limit: Optional[int] = None,
+                                   after: Optional[Tuple[str, str]] = None) -> List[Dict]:
+        """
+        Get bank transactions that haven't been matched yet, newest first.
+        
+        Unpaged by default. With limit, pass after=(transaction_date, id) of the
+        previous page's last row for keyset pagination.
+        """
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor(dictionary=True)
-            
-            cursor.execute("""
-                SELECT * FROM bank_reconciliations 
-                WHERE status = 'UNMATCHED'
-                ORDER BY transaction_date DESC
-            """)
-            
-            transactions = cursor.fetchall()
-            cursor.close()
-            conn.close()
-            
-            return transactions
+            with mysql_conn() as conn:
+                cursor = conn.cursor(dictionary=True)
+                
+                query = f"SELECT {RECONCILIATION_COLUMNS} FROM bank_reconciliations WHERE status = 'UNMATCHED'"
+                params = []
+                
+                if after:
+                    query += " AND (transaction_date, id) < (%s, %s)"
+                    params.extend(after)
+                
+                query += " ORDER BY transaction_date DESC, id DESC"
+                if limit:
+                    query += " LIMIT %s"
+                    params.append(limit)
+                
+                cursor.execute(query, params)
+                
+                transactions = cursor.fetchall()
+                cursor.close()
+                
+                return transactions
+        except PoolExhaustedError:
+            raise
         except Exception as e:
             print(f"[PaymentService] Error getting unmatched: {e}")
             return []
@@ -390,26 +511,27 @@ class PaymentService:
     def reconcile_transaction(self, recon_id: str, batch_id: str, matched_by: str) -> Dict:
         """Match a bank transaction to a payment batch."""
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                UPDATE bank_reconciliations
-                SET status = 'MATCHED', matched_batch_id = %s, 
-                    matched_by = %s, matched_at = NOW()
-                WHERE id = %s
-            """, (batch_id, matched_by, recon_id))
-            
-            affected = cursor.rowcount
-            conn.commit()
-            cursor.close()
-            conn.close()
-            
-            if affected > 0:
-                return {'success': True, 'message': 'Transaction matched successfully'}
-            else:
-                return {'success': False, 'error': 'Transaction not found'}
+            with mysql_conn() as conn:
+                cursor = conn.cursor()
+                
+                cursor.execute("""
+                    UPDATE bank_reconciliations
+                    SET status = 'MATCHED', matched_batch_id = %s, 
+                        matched_by = %s, matched_at = NOW()
+                    WHERE id = %s
+                """, (batch_id, matched_by, recon_id))
                 
+                affected = cursor.rowcount
+                conn.commit()
+                cursor.close()
+                
+                if affected > 0:
+                    return {'success': True, 'message': 'Transaction matched successfully'}
+                else:
+                    return {'success': False, 'error': 'Transaction not found'}
+                    
+        except PoolExhaustedError:
+            raise
         except Exception as e:
             print(f"[PaymentService] Error reconciling: {e}")
             return {'success': False, 'error': str(e)}
@@ -420,60 +542,60 @@ class PaymentService:
         based on amount and reference matching.
         """
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor(dictionary=True)
-            
-            # Get unmatched bank transactions
-            cursor.execute("SELECT * FROM bank_reconciliations WHERE status = 'UNMATCHED'")
-            unmatched = cursor.fetchall()
-            
-            matched_count = 0
-            
-            for txn in unmatched:
-                # Try to match by bank reference
+            with mysql_conn() as conn:
+                # Both passes commit together; a failure leaves every row unmatched
+                conn.start_transaction(isolation_level='READ COMMITTED')
+                cursor = conn.cursor()
+                
+                # Match by bank reference
                 cursor.execute("""
-                    SELECT id FROM payment_batches 
-                    WHERE bank_reference = %s AND status = 'PAID'
-                """, (txn['bank_reference'],))
-                match = cursor.fetchone()
-                
-                if match:
-                    cursor.execute("""
-                        UPDATE bank_reconciliations
-                        SET status = 'MATCHED', matched_batch_id = %s, 
-                            matched_by = 'AUTO', matched_at = NOW()
-                        WHERE id = %s
-                    """, (match['id'], txn['id']))
-                    matched_count += 1
-                else:
-                    # Try to match by amount
-                    cursor.execute("""
-                        SELECT id FROM payment_batches 
-                        WHERE ABS(total_amount - %s) < 0.01 AND status = 'PAID'
-                        AND id NOT IN (SELECT matched_batch_id FROM bank_reconciliations WHERE matched_batch_id IS NOT NULL)
-                        LIMIT 1
-                    """, (txn['amount'],))
-                    match = cursor.fetchone()
-                    
-                    if match:
-                        cursor.execute("""
-                            UPDATE bank_reconciliations
-                            SET status = 'MATCHED', matched_batch_id = %s, 
-                                matched_by = 'AUTO_AMOUNT', matched_at = NOW()
-                            WHERE id = %s
-                        """, (match['id'], txn['id']))
-                        matched_count += 1
-            
-            conn.commit()
-            cursor.close()
-            conn.close()
-            
-            return {
-                'success': True,
-                'matched_count': matched_count,
-                'message': f'Auto-matched {matched_count} transactions'
-            }
-            
+                    UPDATE bank_reconciliations br
+                    INNER JOIN payment_batches pb
+                            ON pb.bank_reference = br.bank_reference AND pb.status = 'PAID'
+                    SET br.status = 'MATCHED', br.matched_batch_id = pb.id,
+                        br.matched_by = 'AUTO', br.matched_at = NOW()
+                    WHERE br.status = 'UNMATCHED'
+                """)
+                matched_count = cursor.rowcount
+                
+                # Match the rest by amount against PAID batches no row is matched to yet.
+                # Both columns are DECIMAL(15, 2), so "within 0.01" means equal amounts;
+                # numbering each side within its amount pairs the n-th unmatched row with
+                # the n-th free batch, so a batch is never claimed twice
+                cursor.execute("""
+                    UPDATE bank_reconciliations br
+                    INNER JOIN (
+                        SELECT u.id AS recon_id, f.id AS batch_id
+                        FROM (
+                            SELECT id, amount,
+                                   ROW_NUMBER() OVER (PARTITION BY amount ORDER BY id) AS rn
+                            FROM bank_reconciliations
+                            WHERE status = 'UNMATCHED'
+                        ) u
+                        INNER JOIN (
+                            SELECT pb.id, pb.total_amount,
+                                   ROW_NUMBER() OVER (PARTITION BY pb.total_amount ORDER BY pb.id) AS rn
+                            FROM payment_batches pb
+                            LEFT JOIN bank_reconciliations used ON used.matched_batch_id = pb.id
+                            WHERE pb.status = 'PAID' AND used.id IS NULL
+                        ) f ON f.total_amount = u.amount AND f.rn = u.rn
+                    ) m ON m.recon_id = br.id
+                    SET br.status = 'MATCHED', br.matched_batch_id = m.batch_id,
+                        br.matched_by = 'AUTO_AMOUNT', br.matched_at = NOW()
+                """)
+                matched_count += cursor.rowcount
+                
+                conn.commit()
+                cursor.close()
+                
+                return {
+                    'success': True,
+                    'matched_count': matched_count,
+                    'message': f'Auto-matched {matched_count} transactions'
+                }
+                
+        except PoolExhaustedError:
+            raise
         except Exception as e:
             print(f"[PaymentService] Error auto-reconciling: {e}")
             return {'success': False, 'error': str(e)}
@@ -482,66 +604,107 @@ class PaymentService:
     # EARLY PAYMENT DISCOUNTS
     # =========================================================================
     
-    def calculate_early_discount(self, invoice_id: str) -> Optional[Dict]:
+    def _fetch_invoices_with_terms(self, cursor, invoice_ids: List[str]) -> Dict[str, Dict]:
         """
-        Calculate if early payment discount is available for an invoice.
+        Fetch invoices by id in one query, each joined to its vendor's best active
+        early payment terms (term_discount_percent / term_days_early, NULL if none).
         """
-        try:
-            conn = get_db_connection()
-            cursor = conn.cursor(dictionary=True)
-            
-            # Get invoice details
-            cursor.execute("SELECT * FROM supplier_invoices WHERE id = %s", (invoice_id,))
-            invoice = cursor.fetchone()
-            
-            if not invoice:
-                return None
-            
-            # Get vendor's early payment terms
-            cursor.execute("""
-                SELECT * FROM early_payment_terms 
-                WHERE vendor_id = %s AND is_active = TRUE
-                  AND (valid_to IS NULL OR valid_to >= CURDATE())
-                ORDER BY discount_percent DESC
-                LIMIT 1
-            """, (invoice.get('supplier_id'),))
-            terms = cursor.fetchone()
-            
-            cursor.close()
-            conn.close()
-            
-            if not terms:
-                return {
-                    'eligible': False,
-                    'reason': 'No early payment terms configured for this vendor'
-                }
-            
-            # Calculate days remaining
-            due_date = invoice.get('due_date')
-            if due_date:
-                if isinstance(due_date, str):
-                    due_date = datetime.strptime(due_date, '%Y-%m-%d').date()
-                days_until_due = (due_date - datetime.now().date()).days
-                
-                if days_until_due >= terms['days_early']:
-                    discount_amount = float(invoice['amount']) * (float(terms['discount_percent']) / 100)
-                    return {
-                        'eligible': True,
-                        'discount_percent': float(terms['discount_percent']),
-                        'discount_amount': discount_amount,
-                        'final_amount': float(invoice['amount']) - discount_amount,
-                        'days_until_discount_expires': days_until_due - terms['days_early'],
-                        'original_due_date': str(due_date)
-                    }
-            
+        if not invoice_ids:
+            return {}
+        
+        placeholders = ', '.join(['%s'] * len(invoice_ids))
+        cursor.execute(f"""
+            SELECT si.id, si.amount, si.supplier_id, si.due_date,
+                   ept.discount_percent AS term_discount_percent,
+                   ept.days_early AS term_days_early
+            FROM supplier_invoices si
+            LEFT JOIN early_payment_terms ept
+                   ON ept.vendor_id = si.supplier_id AND ept.is_active = TRUE
+                  AND (ept.valid_to IS NULL OR ept.valid_to >= CURDATE())
+            WHERE si.id IN ({placeholders})
+            ORDER BY ept.discount_percent DESC
+        """, tuple(invoice_ids))
+        
+        # Highest discount sorts first, so keep the first row seen for each invoice
+        invoices = {}
+        for row in cursor.fetchall():
+            invoices.setdefault(row['id'], row)
+        return invoices
+    
+    def _early_discount(self, invoice: Dict, today) -> Dict:
+        """Early payment discount for an invoice row from _fetch_invoices_with_terms."""
+        if invoice.get('term_discount_percent') is None:
             return {
                 'eligible': False,
-                'reason': 'Invoice is past early payment window'
+                'reason': 'No early payment terms configured for this vendor'
             }
-            
+        
+        # Calculate days remaining
+        due_date = invoice.get('due_date')
+        if due_date:
+            if isinstance(due_date, str):
+                due_date = datetime.strptime(due_date, '%Y-%m-%d').date()
+            days_until_due = (due_date - today).days
+            
+            if days_until_due >= invoice['term_days_early']:
+                discount_percent = float(invoice['term_discount_percent'])
+                discount_amount = float(invoice['amount']) * (discount_percent / 100)
+                return {
+                    'eligible': True,
+                    'discount_percent': discount_percent,
+                    'discount_amount': discount_amount,
+                    'final_amount': float(invoice['amount']) - discount_amount,
+                    'days_until_discount_expires': days_until_due - invoice['term_days_early'],
+                    'original_due_date': str(due_date)
+                }
+        
+        return {
+            'eligible': False,
+            'reason': 'Invoice is past early payment window'
+        }
+    
+    def calculate_early_discount_bulk(self, invoice_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Early payment discount for many invoices: cached results where present,
+        the rest from one joined invoice + terms query. Unknown invoices are omitted.
+        """
+        today = datetime.now().date()
+        day = today.isoformat()
+        
+        discounts = {}
+        with _discount_cache_lock:
+            for invoice_id in invoice_ids:
+                cached = _discount_cache.get((invoice_id, day))
+                if cached is not None:
+                    discounts[invoice_id] = dict(cached[1])
+        
+        missing = [invoice_id for invoice_id in dict.fromkeys(invoice_ids) if invoice_id not in discounts]
+        if not missing:
+            return discounts
+        
+        try:
+            with mysql_conn() as conn:
+                cursor = conn.cursor(dictionary=True)
+                invoices = self._fetch_invoices_with_terms(cursor, missing)
+                cursor.close()
+        except PoolExhaustedError:
+            raise
         except Exception as e:
-            print(f"[PaymentService] Error calculating discount: {e}")
-            return None
+            print(f"[PaymentService] Error calculating discounts: {e}")
+            return discounts
+        
+        with _discount_cache_lock:
+            for invoice_id, invoice in invoices.items():
+                result = self._early_discount(invoice, today)
+                _discount_cache[(invoice_id, day)] = (invoice.get('supplier_id'), result)
+                discounts[invoice_id] = dict(result)
+        return discounts
+    
+    def calculate_early_discount(self, invoice_id: str) -> Optional[Dict]:
+        """
+        Calculate if early payment discount is available for an invoice.
+        """
+        return self.calculate_early_discount_bulk([invoice_id]).get(invoice_id)
     
     def set_vendor_early_payment_terms(
         self, vendor_id: str, vendor_name: str,
@@ -549,31 +712,34 @@ class PaymentService:
     ) -> Dict:
         """Set or update early payment terms for a vendor."""
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            
-            term_id = str(uuid.uuid4())
-            
-            # Deactivate existing terms
-            cursor.execute("""
-                UPDATE early_payment_terms 
-                SET is_active = FALSE 
-                WHERE vendor_id = %s
-            """, (vendor_id,))
-            
-            # Insert new terms
-            cursor.execute("""
-                INSERT INTO early_payment_terms
-                (id, vendor_id, vendor_name, discount_percent, days_early, valid_from)
-                VALUES (%s, %s, %s, %s, %s, CURDATE())
-            """, (term_id, vendor_id, vendor_name, discount_percent, days_early))
+            with mysql_conn() as conn:
+                cursor = conn.cursor()
+                
+                term_id = str(uuid.uuid4())
+                
+                # Deactivate existing terms
+                cursor.execute("""
+                    UPDATE early_payment_terms 
+                    SET is_active = FALSE 
+                    WHERE vendor_id = %s
+                """, (vendor_id,))
+                
+                # Insert new terms
+                cursor.execute("""
+                    INSERT INTO early_payment_terms
+                    (id, vendor_id, vendor_name, discount_percent, days_early, valid_from)
+                    VALUES (%s, %s, %s, %s, %s, CURDATE())
+                """, (term_id, vendor_id, vendor_name, discount_percent, days_early))
+                
+                conn.commit()
+                cursor.close()
             
-            conn.commit()
-            cursor.close()
-            conn.close()
+            invalidate_discount_cache(vendor_id)
             
             return {'success': True, 'term_id': term_id}
-            
+                
+        except PoolExhaustedError:
+            raise
         except Exception as e:
             print(f"[PaymentService] Error setting terms: {e}")
             return {'success': False, 'error': str(e)}
@@ -582,25 +748,50 @@ class PaymentService:
     # VENDOR PAYMENT PORTAL
     # =========================================================================
     
-    def get_vendor_payments(self, vendor_id: str) -> List[Dict]:
-        """Get all payments for a specific vendor."""
+    def get_vendor_payments(self, vendor_id: str, limit: Optional[int] = None,
+                            after: Optional[Tuple[str, str]] = None) -> List[Dict]:
+        """
+        Get all payments for a specific vendor, newest first.
+        
+        Unpaged by default. With limit, pass after=(created_at, id) of the previous
+        page's last row for keyset pagination; created_at may be None (rows without
+        one come after every dated row).
+        """
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor(dictionary=True)
-            
-            cursor.execute("""
-                SELECT pt.*, pb.batch_number, pb.payment_method, pb.paid_at as batch_paid_at
-                FROM payment_transactions pt
-                INNER JOIN payment_batches pb ON pt.batch_id = pb.id
-                WHERE pt.vendor_id = %s
-                ORDER BY pt.created_at DESC
-            """, (vendor_id,))
-            
-            payments = cursor.fetchall()
-            cursor.close()
-            conn.close()
-            
-            return payments
+            with mysql_conn() as conn:
+                cursor = conn.cursor(dictionary=True)
+                
+                query = f"""
+                    SELECT {TRANSACTION_COLUMNS}, pb.batch_number, pb.payment_method, pb.paid_at as batch_paid_at
+                    FROM payment_transactions pt
+                    INNER JOIN payment_batches pb ON pt.batch_id = pb.id
+                    WHERE pt.vendor_id = %s
+                """
+                params = [vendor_id]
+                
+                if after:
+                    created_at, last_id = after
+                    if created_at is None:
+                        # Already in the NULL created_at tail, which DESC sorts last
+                        query += " AND pt.created_at IS NULL AND pt.id < %s"
+                        params.append(last_id)
+                    else:
+                        query += " AND ((pt.created_at, pt.id) < (%s, %s) OR pt.created_at IS NULL)"
+                        params.extend(after)
+                
+                query += " ORDER BY pt.created_at DESC, pt.id DESC"
+                if limit:
+                    query += " LIMIT %s"
+                    params.append(limit)
+                
+                cursor.execute(query, params)
+                
+                payments = cursor.fetchall()
+                cursor.close()
+                
+                return payments
+        except PoolExhaustedError:
+            raise
         except Exception as e:
             print(f"[PaymentService] Error getting vendor payments: {e}")
             return []
@@ -608,41 +799,34 @@ class PaymentService:
     def get_vendor_payment_summary(self, vendor_id: str) -> Dict:
         """Get payment summary for vendor dashboard."""
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor(dictionary=True)
-            
-            # Total paid
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as total_payments,
-                    COALESCE(SUM(final_amount), 0) as total_paid,
-                    COALESCE(SUM(discount_amount), 0) as total_discounts
-                FROM payment_transactions
-                WHERE vendor_id = %s AND status = 'PAID'
-            """, (vendor_id,))
-            paid_stats = cursor.fetchone()
-            
-            # Pending
-            cursor.execute("""
-                SELECT 
-                    COUNT(*) as pending_count,
-                    COALESCE(SUM(final_amount), 0) as pending_amount
-                FROM payment_transactions
-                WHERE vendor_id = %s AND status IN ('PENDING', 'INCLUDED', 'PROCESSING')
-            """, (vendor_id,))
-            pending_stats = cursor.fetchone()
-            
-            cursor.close()
-            conn.close()
-            
-            return {
-                'total_payments': paid_stats['total_payments'],
-                'total_paid': float(paid_stats['total_paid']),
-                'total_discounts_received': float(paid_stats['total_discounts']),
-                'pending_payments': pending_stats['pending_count'],
-                'pending_amount': float(pending_stats['pending_amount'])
-            }
-            
+            with mysql_conn() as conn:
+                cursor = conn.cursor(dictionary=True)
+                
+                # Paid and pending totals in one pass over the vendor's transactions
+                cursor.execute("""
+                    SELECT 
+                        COUNT(CASE WHEN status = 'PAID' THEN 1 END) as total_payments,
+                        COALESCE(SUM(CASE WHEN status = 'PAID' THEN final_amount END), 0) as total_paid,
+                        COALESCE(SUM(CASE WHEN status = 'PAID' THEN discount_amount END), 0) as total_discounts,
+                        COUNT(CASE WHEN status <> 'PAID' THEN 1 END) as pending_count,
+                        COALESCE(SUM(CASE WHEN status <> 'PAID' THEN final_amount END), 0) as pending_amount
+                    FROM payment_transactions
+                    WHERE vendor_id = %s AND status IN ('PAID', 'PENDING', 'INCLUDED', 'PROCESSING')
+                """, (vendor_id,))
+                stats = cursor.fetchone()
+                
+                cursor.close()
+                
+                return {
+                    'total_payments': stats['total_payments'],
+                    'total_paid': float(stats['total_paid']),
+                    'total_discounts_received': float(stats['total_discounts']),
+                    'pending_payments': stats['pending_count'],
+                    'pending_amount': float(stats['pending_amount'])
+                }
+                
+        except PoolExhaustedError:
+            raise
         except Exception as e:
             print(f"[PaymentService] Error getting vendor summary: {e}")
             return {}
@@ -653,23 +837,36 @@ class PaymentService:
     
     def get_exchange_rate(self, from_currency: str, to_currency: str) -> Optional[float]:
         """Get latest exchange rate between currencies."""
+        key = (from_currency, to_currency)
+        with _rate_cache_lock:
+            rate = _rate_cache.get(key)
+        if rate is not None:
+            return rate
+        
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor(dictionary=True)
-            
-            cursor.execute("""
-                SELECT rate FROM currency_rates
-                WHERE from_currency = %s AND to_currency = %s
-                ORDER BY effective_date DESC
-                LIMIT 1
-            """, (from_currency, to_currency))
-            
-            result = cursor.fetchone()
-            cursor.close()
-            conn.close()
-            
-            return float(result['rate']) if result else None
+            with mysql_conn() as conn:
+                cursor = conn.cursor(dictionary=True)
+                
+                cursor.execute("""
+                    SELECT rate FROM currency_rates
+                    WHERE from_currency = %s AND to_currency = %s
+                    ORDER BY effective_date DESC
+                    LIMIT 1
+                """, (from_currency, to_currency))
+                
+                result = cursor.fetchone()
+                cursor.close()
+                
+            if not result:
+                return None
             
+            rate = float(result['rate'])
+            with _rate_cache_lock:
+                _rate_cache[key] = rate
+            return rate
+                
+        except PoolExhaustedError:
+            raise
         except Exception as e:
             print(f"[PaymentService] Error getting rate: {e}")
             return None
@@ -677,24 +874,28 @@ class PaymentService:
     def set_exchange_rate(self, from_currency: str, to_currency: str, rate: float) -> Dict:
         """Set exchange rate for a currency pair."""
         try:
-            conn = get_db_connection()
-            cursor = conn.cursor()
-            
-            rate_id = str(uuid.uuid4())
-            today = datetime.now().strftime('%Y-%m-%d')
-            
-            cursor.execute("""
-                INSERT INTO currency_rates (id, from_currency, to_currency, rate, effective_date)
-                VALUES (%s, %s, %s, %s, %s)
-                ON DUPLICATE KEY UPDATE rate = %s
-            """, (rate_id, from_currency, to_currency, rate, today, rate))
+            with mysql_conn() as conn:
+                cursor = conn.cursor()
+                
+                rate_id = str(uuid.uuid4())
+                today = datetime.now().strftime('%Y-%m-%d')
+                
+                cursor.execute("""
+                    INSERT INTO currency_rates (id, from_currency, to_currency, rate, effective_date)
+                    VALUES (%s, %s, %s, %s, %s)
+                    ON DUPLICATE KEY UPDATE rate = %s
+                """, (rate_id, from_currency, to_currency, rate, today, rate))
+                
+                conn.commit()
+                cursor.close()
             
-            conn.commit()
-            cursor.close()
-            conn.close()
+            with _rate_cache_lock:
+                _rate_cache.pop((from_currency, to_currency), None)
             
             return {'success': True}
-            
+                
+        except PoolExhaustedError:
+            raise
         except Exception as e:
             print(f"[PaymentService] Error setting rate: {e}")
             return {'success': False, 'error': str(e)}